@@ -0,0 +1,211 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.authentication import aauthenticate_token
+from api.cache import aget_stamps, anonymous_cache_key
+from api.catalog import ingredient_catalog, payload_response
+from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+                             TagSerializer)
+from foodgram import constants as c
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+TRUE_VALUES = ('1', 'true', 'True')
+
+
+class AsyncAPIError(Exception):
+
+    def __init__(self, detail, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), status=status_code,
+                        content_type='application/json')
+
+
+def api_view(view):
+    @require_GET
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            request.user = await authenticate(request)
+            response = await view(request, *args, **kwargs)
+        except AsyncAPIError as error:
+            return json_response(error.detail, error.status_code)
+        if isinstance(response, HttpResponse):
+            return response
+        return json_response(response)
+    return wrapper
+
+
+def anonymous_cache(scope, ignored=()):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return await view(request, *args, **kwargs)
+            pk = kwargs.get('pk')
+            stamps = await aget_stamps(scope, f'{scope}:{pk or "list"}')
+            key = 'async:' + anonymous_cache_key(scope, pk, stamps,
+                                                 request.GET, ignored)
+            data = await cache.aget(key)
+            if data is None:
+                data = await view(request, *args, **kwargs)
+                await cache.aset(key, data, c.ANONYMOUS_CACHE_TTL)
+            return data
+        return wrapper
+    return decorator
+
+
+async def authenticate(request):
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword != 'Token':
+        return AnonymousUser()
+    user = await aauthenticate_token(key.strip())
+    if user is None:
+        raise AsyncAPIError({'detail': 'Invalid token.'},
+                            status.HTTP_401_UNAUTHORIZED)
+    return user
+
+
+async def filter_recipes(request, queryset):
+    params = request.GET
+    slugs = params.getlist('tags')
+    if slugs:
+        known = {slug async for slug in Tag.objects.filter(
+            slug__in=slugs).values_list('slug', flat=True)}
+        unknown = [slug for slug in slugs if slug not in known]
+        if unknown:
+            raise AsyncAPIError({'tags': [
+                f'Select a valid choice. {unknown[0]} is not one of the '
+                'available choices.']})
+        queryset = queryset.filter(tags__slug__in=slugs).distinct()
+    author = params.get('author')
+    if author:
+        if (not author.isdigit()
+                or not await User.objects.filter(pk=author).aexists()):
+            raise AsyncAPIError({'author': [
+                'Select a valid choice. That choice is not one of the '
+                'available choices.']})
+        queryset = queryset.filter(author_id=author)
+    user = request.user
+    if user.is_authenticated:
+        if params.get('is_favorited') in TRUE_VALUES:
+            queryset = queryset.filter(favorites__user=user)
+        if params.get('is_in_shopping_cart') in TRUE_VALUES:
+            queryset = queryset.filter(shopping_lists__user=user)
+    return queryset
+
+
+def page_links(request, number, page_size, count):
+    url = request.build_absolute_uri()
+    next_link = previous_link = None
+    if number * page_size < count:
+        next_link = replace_query_param(url, 'page', number + 1)
+    if number == 2:
+        previous_link = remove_query_param(url, 'page')
+    elif number > 2:
+        previous_link = replace_query_param(url, 'page', number - 1)
+    return next_link, previous_link
+
+
+@api_view
+@anonymous_cache('recipes', ('is_favorited', 'is_in_shopping_cart'))
+async def recipe_list(request):
+    queryset = await filter_recipes(
+        request, Recipe.objects.for_read(request.user))
+    limit = request.GET.get('limit', '')
+    page_size = int(limit) if limit.isdigit() and int(limit) else c.PAGE_SIZE
+    number = request.GET.get('page', '1')
+    if not number.isdigit() or int(number) < 1:
+        raise AsyncAPIError({'detail': 'Invalid page.'},
+                            status.HTTP_404_NOT_FOUND)
+    number = int(number)
+    count = await queryset.acount()
+    if number > 1 and (number - 1) * page_size >= count:
+        raise AsyncAPIError({'detail': 'Invalid page.'},
+                            status.HTTP_404_NOT_FOUND)
+    offset = (number - 1) * page_size
+    recipes = [recipe async for recipe in
+               queryset[offset:offset + page_size]]
+    next_link, previous_link = page_links(request, number, page_size, count)
+    return {
+        'count': count,
+        'next': next_link,
+        'previous': previous_link,
+        'results': RecipeReadSerializer(
+            recipes, many=True, context={'request': request}).data,
+    }
+
+
+@api_view
+@anonymous_cache('recipes')
+async def recipe_detail(request, pk):
+    recipe = await Recipe.objects.for_read(request.user).filter(
+        pk=pk).afirst()
+    if recipe is None:
+        raise AsyncAPIError({'detail': 'No Recipe matches the given query.'},
+                            status.HTTP_404_NOT_FOUND)
+    return RecipeReadSerializer(recipe, context={'request': request}).data
+
+
+@api_view
+@anonymous_cache('tags')
+async def tag_list(request):
+    tags = [tag async for tag in Tag.objects.all()]
+    return TagSerializer(tags, many=True).data
+
+
+@api_view
+@anonymous_cache('tags')
+async def tag_detail(request, pk):
+    tag = await Tag.objects.filter(pk=pk).afirst()
+    if tag is None:
+        raise AsyncAPIError({'detail': 'No Tag matches the given query.'},
+                            status.HTTP_404_NOT_FOUND)
+    return TagSerializer(tag).data
+
+
+@api_view
+async def ingredient_list(request):
+    name = request.GET.get('name')
+    if name is not None:
+        return await sync_to_async(ingredient_catalog.search)(name)
+    since = request.GET.get('since')
+    if since is not None:
+        if not since.isdigit():
+            raise AsyncAPIError({'since': [
+                'Catalog version must be a non-negative integer.']})
+        return await sync_to_async(ingredient_catalog.changes_since)(
+            int(since))
+    return payload_response(
+        request, await sync_to_async(ingredient_catalog.get_payload)())
+
+
+@api_view
+async def ingredient_detail(request, pk):
+    ingredient = await Ingredient.objects.filter(pk=pk).afirst()
+    if ingredient is None:
+        raise AsyncAPIError(
+            {'detail': 'No Ingredient matches the given query.'},
+            status.HTTP_404_NOT_FOUND)
+    return IngredientSerializer(ingredient).data
+
+
+@require_GET
+async def short_url(request, pk):
+    if not await Recipe.objects.filter(pk=pk).aexists():
+        raise Http404(f'Recipe "{pk}" does not exist.')
+    return redirect(f'/recipes/{pk}/')
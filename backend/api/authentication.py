@@ -0,0 +1,131 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.cache import aget_stamps, get_stamp
+from foodgram import constants as c
+
+
+class TokenCache:
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[digest]
+                return None
+            self.entries.move_to_end(digest)
+            return value
+
+    def set(self, digest, value):
+        with self.lock:
+            self.entries[digest] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+token_cache = TokenCache(c.TOKEN_CACHE_SIZE, c.TOKEN_CACHE_TTL)
+
+
+def token_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def shared_key(digest):
+    return f'auth:token:{digest}'
+
+
+def owner_key(digest):
+    return f'auth:owner:{digest}'
+
+
+def remember_owner(key, user_pk):
+    cache.set(owner_key(token_digest(key)), user_pk, c.TOKEN_OWNER_TTL)
+
+
+def remember(digest, user, pending):
+    # Only cache under a generation read before the database lookup;
+    # a stamp read afterwards could already include a revocation.
+    if pending is None or pending[0] != user.pk:
+        cache.set(owner_key(digest), user.pk, c.TOKEN_OWNER_TTL)
+        return
+    entry = (user, pending[1])
+    token_cache.set(digest, entry)
+    cache.set(shared_key(digest), entry, c.TOKEN_CACHE_TTL)
+
+
+def cached_user(digest):
+    entry = token_cache.get(digest) or cache.get(shared_key(digest))
+    if entry is None:
+        owner = cache.get(owner_key(digest))
+        if owner is None:
+            return None, None
+        return None, (owner, get_stamp(f'auth:{owner}'))
+    user, generation = entry
+    current = get_stamp(f'auth:{user.pk}')
+    if current != generation:
+        return None, (user.pk, current)
+    token_cache.set(digest, entry)
+    return copy.copy(user), None
+
+
+async def acached_user(digest):
+    entry = token_cache.get(digest) or await cache.aget(shared_key(digest))
+    if entry is None:
+        owner = await cache.aget(owner_key(digest))
+        if owner is None:
+            return None, None
+        return None, (owner, (await aget_stamps(f'auth:{owner}'))[0])
+    user, generation = entry
+    current = (await aget_stamps(f'auth:{user.pk}'))[0]
+    if current != generation:
+        return None, (user.pk, current)
+    token_cache.set(digest, entry)
+    return copy.copy(user), None
+
+
+async def aauthenticate_token(key):
+    digest = token_digest(key)
+    user, pending = await acached_user(digest)
+    if user is not None:
+        return user
+    token = await Token.objects.select_related('user').filter(
+        key=key).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    if pending is None or pending[0] != token.user.pk:
+        await cache.aset(owner_key(digest), token.user.pk,
+                         c.TOKEN_OWNER_TTL)
+    else:
+        entry = (token.user, pending[1])
+        token_cache.set(digest, entry)
+        await cache.aset(shared_key(digest), entry, c.TOKEN_CACHE_TTL)
+    return copy.copy(token.user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        user, pending = cached_user(digest)
+        if user is not None:
+            return user, Token(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        remember(digest, user, pending)
+        return copy.copy(user), token
@@ -0,0 +1,152 @@
+import hashlib
+import math
+import time
+import uuid
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from foodgram import constants as c
+
+
+def new_stamp():
+    return f'{time.time():.6f}-{uuid.uuid4().hex[:12]}'
+
+
+def stamp_time(stamp):
+    return float(stamp.partition('-')[0])
+
+
+def get_stamps(*names):
+    keys = [f'stamp:{name}' for name in names]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, new_stamp(), None)
+            stamps[key] = cache.get(key)
+    return [stamps[key] for key in keys]
+
+
+async def aget_stamps(*names):
+    keys = [f'stamp:{name}' for name in names]
+    stamps = await cache.aget_many(keys)
+    for key in keys:
+        if key not in stamps:
+            await cache.aadd(key, new_stamp(), None)
+            stamps[key] = await cache.aget(key)
+    return [stamps[key] for key in keys]
+
+
+def get_stamp(name):
+    return get_stamps(name)[0]
+
+
+def bump_stamps(*names):
+    cache.set_many({f'stamp:{name}': new_stamp() for name in names}, None)
+
+
+def normalize_query(query_params, ignored=()):
+    return '&'.join(
+        f'{key}={value}'
+        for key in sorted(query_params)
+        if key not in ignored
+        for value in sorted(query_params.getlist(key))
+    )
+
+
+def anonymous_cache_key(scope, pk, stamps, query_params, ignored=()):
+    query = hashlib.sha1(normalize_query(query_params, ignored).encode())
+    return (f'anon:{scope}:{pk or "list"}:{":".join(stamps)}:'
+            f'{query.hexdigest()}')
+
+
+class AnonymousCacheMixin:
+    cache_scope = None
+    cache_ignored_params = ()
+
+    def get_cache_stamps(self, pk=None):
+        return get_stamps(self.cache_scope,
+                          f'{self.cache_scope}:{pk or "list"}')
+
+    def get_cache_key(self, request, pk=None):
+        return anonymous_cache_key(
+            self.cache_scope, pk, self.get_cache_stamps(pk),
+            request.query_params, self.cache_ignored_params)
+
+    def cached_response(self, request, render, pk=None):
+        if request.user.is_authenticated:
+            return render()
+        key = self.get_cache_key(request, pk)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = render()
+        if response.status_code == 200:
+            cache.set(key, response.data, c.ANONYMOUS_CACHE_TTL)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(AnonymousCacheMixin, self).list(
+                request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(AnonymousCacheMixin, self).retrieve(
+                request, *args, **kwargs),
+            pk=kwargs[self.lookup_url_kwarg or self.lookup_field])
+
+
+class ConditionalGetMixin:
+    cache_scope = None
+    cache_ignored_params = ()
+    last_modified_field = None
+
+    def get_validators(self, request, pk=None):
+        names = [self.cache_scope, f'{self.cache_scope}:{pk or "list"}']
+        if request.user.is_authenticated:
+            names.append(f'viewer:{request.user.pk}')
+        stamps = get_stamps(*names)
+        last_modified = max(map(stamp_time, stamps))
+        if pk is not None and self.last_modified_field:
+            try:
+                modified = self.get_queryset().model.objects.filter(
+                    pk=pk).values_list(self.last_modified_field,
+                                       flat=True).first()
+            except (TypeError, ValueError):
+                modified = None
+            if modified is None:
+                return None, None
+            last_modified = max(last_modified, modified.timestamp())
+        etag = hashlib.sha1(':'.join((
+            str(pk), *stamps, str(last_modified),
+            normalize_query(request.query_params,
+                            self.cache_ignored_params),
+        )).encode()).hexdigest()
+        return f'"{etag}"', math.ceil(last_modified)
+
+    def conditional_response(self, request, render, pk=None):
+        etag, last_modified = self.get_validators(request, pk)
+        if etag is None:
+            return render()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs),
+            pk=kwargs[self.lookup_url_kwarg or self.lookup_field])
@@ -0,0 +1,171 @@
+import bisect
+import gzip
+import hashlib
+import threading
+from collections import Counter, defaultdict
+
+from django.db import DatabaseError
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from api.cache import get_stamp
+from foodgram import constants as c
+from recipes.models import Ingredient, IngredientChange
+
+
+def normalize(text):
+    return ' '.join(text.casefold().replace('ё', 'е').split())
+
+
+def ngrams(text):
+    padded = f' {text} '
+    size = c.SEARCH_NGRAM_SIZE
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+class IngredientIndex:
+
+    def __init__(self, rows):
+        self.items = {}
+        keys = []
+        self.postings = defaultdict(list)
+        self.gram_counts = {}
+        for pk, name, measurement_unit in rows:
+            key = normalize(name)
+            self.items[pk] = {
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            }
+            keys.append((key, pk))
+            grams = ngrams(key)
+            self.gram_counts[pk] = len(grams)
+            for gram in grams:
+                self.postings[gram].append(pk)
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.ids = [pk for _, pk in keys]
+
+    def prefix(self, query):
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_left(self.keys, query + '\U0010ffff', start)
+        matches = range(start, end)
+        return [
+            self.ids[i]
+            for i in sorted(matches, key=lambda i: (len(self.keys[i]), i))
+        ]
+
+    def fuzzy(self, query, exclude):
+        grams = ngrams(query)
+        hits = Counter(
+            pk for gram in grams for pk in self.postings.get(gram, ())
+        )
+        scored = []
+        for pk, shared in hits.items():
+            if pk in exclude:
+                continue
+            score = shared / (len(grams) + self.gram_counts[pk] - shared)
+            if score >= c.SEARCH_FUZZY_THRESHOLD:
+                scored.append((-score, pk))
+        scored.sort()
+        return [pk for _, pk in scored[:c.SEARCH_FUZZY_LIMIT]]
+
+    def search(self, query):
+        query = normalize(query)
+        if not query:
+            return list(self.items.values())
+        ids = self.prefix(query)
+        if len(query) >= c.SEARCH_NGRAM_SIZE:
+            ids += self.fuzzy(query, set(ids))
+        return [self.items[pk] for pk in ids]
+
+
+class CatalogPayload:
+
+    def __init__(self, items, version):
+        self.version = version
+        self.body = JSONRenderer().render(items)
+        self.gzipped = gzip.compress(self.body, c.CATALOG_GZIP_LEVEL)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+
+class IngredientCatalog:
+
+    def __init__(self):
+        self.index = None
+        self.payload = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        version = get_stamp('ingredients')
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    change_version = IngredientChange.current_version()
+                    rows = list(Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'))
+                    index = IngredientIndex(rows)
+                    self.index = index
+                    self.payload = CatalogPayload(
+                        [index.items[pk] for pk, _, _ in rows],
+                        change_version,
+                    )
+                    self.version = version
+        return self
+
+    def search(self, query):
+        return self.refresh().index.search(query)
+
+    def get_payload(self):
+        return self.refresh().payload
+
+    def changes_since(self, since):
+        changes = {}
+        version = since
+        for change in IngredientChange.objects.filter(id__gt=since):
+            changes[change.ingredient_id] = change
+            version = change.id
+        return {
+            'version': version,
+            'changed': [
+                {
+                    'id': change.ingredient_id,
+                    'name': change.name,
+                    'measurement_unit': change.measurement_unit,
+                }
+                for change in changes.values()
+                if change.action != IngredientChange.DELETED
+            ],
+            'deleted': [
+                change.ingredient_id
+                for change in changes.values()
+                if change.action == IngredientChange.DELETED
+            ],
+        }
+
+    def warm(self):
+        try:
+            self.refresh()
+        except DatabaseError:
+            pass
+
+
+ingredient_catalog = IngredientCatalog()
+
+
+def payload_response(request, payload):
+    if payload.etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(payload.gzipped,
+                                content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(payload.body,
+                                content_type='application/json')
+    response['ETag'] = payload.etag
+    response['X-Catalog-Version'] = payload.version
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG:
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f'The default cache uses {backend}, which is private to one '
+        'process.',
+        hint='Cache stamps, the ingredient catalog and token revocation '
+             'must be shared between workers and management commands: '
+             'set CACHE_BACKEND=redis (or file) with CACHE_LOCATION.',
+        id='api.E001',
+    )]
@@ -0,0 +1,163 @@
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F
+from django.http import (HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+
+from api.cache import get_stamp
+from foodgram import constants as c
+from recipes.models import ShoppingCartItem, ShoppingList
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=c.EXPORT_PDF_WORKERS)
+    return _executor
+
+
+def cart_rows(user):
+    return (
+        ShoppingCartItem.objects.filter(user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit',
+                sum=F('total'))
+        .order_by('ingredient__name')
+        .iterator(chunk_size=c.EXPORT_CHUNK_SIZE)
+    )
+
+
+def cart_etag(user, file_format):
+    contents = ShoppingList.objects.filter(user=user).order_by(
+        'recipe_id').values_list('recipe_id', 'recipe__modified')
+    # Ingredient renames and unit changes do not touch Recipe.modified.
+    digest = hashlib.sha1(
+        f'{file_format}:{get_stamp("ingredients")}'.encode())
+    for recipe_id, modified in contents:
+        digest.update(f'{recipe_id}:{modified.isoformat()};'.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def render_txt(rows):
+    for row in rows:
+        yield (f'{row["ingredient__name"]} - {row["sum"]} '
+               f'({row["ingredient__measurement_unit"]})\n')
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in rows:
+        yield writer.writerow((row['ingredient__name'],
+                               row['ingredient__measurement_unit'],
+                               row['sum']))
+
+
+def render_json(rows):
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps({
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'amount': row['sum'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+def render_pdf(lines, font_path):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    font = 'Helvetica'
+    if font_path and os.path.exists(font_path):
+        font = 'ExportFont'
+        pdfmetrics.registerFont(TTFont(font, font_path))
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin = c.EXPORT_PDF_MARGIN
+    line_height = c.EXPORT_PDF_FONT_SIZE * 1.5
+    y = height - margin
+    pdf.setFont(font, c.EXPORT_PDF_FONT_SIZE)
+    for line in lines:
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font, c.EXPORT_PDF_FONT_SIZE)
+            y = height - margin
+        pdf.drawString(margin, y, line)
+        y -= line_height
+    pdf.save()
+    return buffer.getvalue()
+
+
+async def aiterate(parts):
+    next_chunk = sync_to_async(
+        lambda: list(itertools.islice(parts, c.EXPORT_CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        for part in chunk:
+            yield part
+
+
+def streaming_content(request, parts):
+    # Under ASGI Django buffers sync iterators in full, so feed it an
+    # async one that pulls rows in chunks on the request's thread.
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return aiterate(parts)
+    return parts
+
+
+STREAMING_FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'json': (render_json, 'application/json'),
+}
+FORMATS = (*STREAMING_FORMATS, 'pdf')
+
+
+def pdf_response(user, etag):
+    key = f'cart-pdf:{user.pk}:{etag}'
+    content = cache.get(key)
+    if content is None:
+        lines = [line.rstrip('\n') for line in render_txt(cart_rows(user))]
+        content = get_executor().submit(
+            render_pdf, lines, settings.EXPORT_PDF_FONT).result()
+        cache.set(key, content, c.EXPORT_CACHE_TTL)
+    return HttpResponse(content, content_type='application/pdf')
+
+
+def export_shopping_cart(request, file_format):
+    etag = cart_etag(request.user, file_format)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    elif file_format == 'pdf':
+        response = pdf_response(request.user, etag)
+    else:
+        render, content_type = STREAMING_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            streaming_content(request, render(cart_rows(request.user))),
+            content_type=content_type)
+    response['ETag'] = etag
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_list.{file_format}"')
+    return response
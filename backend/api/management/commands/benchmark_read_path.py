@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+ROUTES = (
+    ('/api/recipes/', '/api/async/recipes/'),
+    ('/api/recipes/{recipe}/', '/api/async/recipes/{recipe}/'),
+    ('/api/tags/', '/api/async/tags/'),
+    ('/api/ingredients/?name={ingredient}',
+     '/api/async/ingredients/?name={ingredient}'),
+    ('/s/{recipe}/', '/api/async/s/{recipe}/'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Compare read throughput of the WSGI read endpoints with their '
+            'async twins under /api/async/ on the current database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per path and mode')
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help='Requests in flight on the ASGI path')
+        parser.add_argument('--latency', type=float, default=5,
+                            help='Milliseconds added to every SQL query to '
+                                 'imitate a remote database')
+        parser.add_argument('--user', type=str,
+                            help='Send requests with this username\'s token '
+                                 'instead of anonymously')
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.order_by('pk').first()
+        ingredient = Ingredient.objects.order_by('pk').first()
+        if recipe is None or ingredient is None or not Tag.objects.exists():
+            raise CommandError('Nothing to read: run generate_data first.')
+        headers = {}
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'No user {options["user"]!r}.')
+            token, _ = Token.objects.get_or_create(user=user)
+            headers['Authorization'] = f'Token {token.key}'
+        self.latency = options['latency'] / 1000
+        setup_test_environment()
+        connection_created.connect(self.add_latency)
+        for connection in connections.all(initialized_only=True):
+            connection.execute_wrappers.append(self.delay)
+        try:
+            for wsgi_url, asgi_url in ROUTES:
+                values = {'recipe': recipe.pk,
+                          'ingredient': ingredient.name[:3]}
+                self.compare(wsgi_url.format(**values),
+                             asgi_url.format(**values), headers,
+                             options['requests'], options['concurrency'])
+        finally:
+            connection_created.disconnect(self.add_latency)
+            for connection in connections.all(initialized_only=True):
+                if self.delay in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(self.delay)
+            teardown_test_environment()
+
+    def add_latency(self, sender, connection, **kwargs):
+        if self.delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self.delay)
+
+    def delay(self, execute, sql, params, many, context):
+        time.sleep(self.latency)
+        return execute(sql, params, many, context)
+
+    def compare(self, wsgi_url, asgi_url, headers, requests, concurrency):
+        wsgi_status, wsgi_elapsed = self.run_wsgi(wsgi_url, headers,
+                                                  requests)
+        asgi_status, asgi_elapsed = asyncio.run(
+            self.run_asgi(asgi_url, headers, requests, concurrency))
+        if wsgi_status != asgi_status:
+            raise CommandError(
+                f'{wsgi_url}: WSGI answered {wsgi_status}, '
+                f'ASGI answered {asgi_status}.')
+        self.stdout.write(
+            f'{wsgi_url:40} wsgi {requests / wsgi_elapsed:8.1f} req/s   '
+            f'asgi {requests / asgi_elapsed:8.1f} req/s   '
+            f'x{wsgi_elapsed / asgi_elapsed:.1f}')
+
+    @staticmethod
+    def run_wsgi(url, headers, requests):
+        client = Client(headers=headers)
+        statuses = set()
+        started = time.perf_counter()
+        for _ in range(requests):
+            statuses.add(client.get(url).status_code)
+        return statuses, time.perf_counter() - started
+
+    @staticmethod
+    async def run_asgi(url, headers, requests, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with semaphore, ThreadSensitiveContext():
+                return (await client.get(url, headers=headers)).status_code
+
+        started = time.perf_counter()
+        statuses = set(await asyncio.gather(
+            *(fetch() for _ in range(requests))))
+        return statuses, time.perf_counter() - started
@@ -0,0 +1,290 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.urls import URLResolver, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import urls as api_urls
+from recipes import cart, counters, feed
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingList, Tag)
+from users.models import Follow, User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=='
+)
+
+DEFAULT_QUERY_BUDGET = 6
+DEFAULT_TIME_BUDGET_MS = 250
+QUERY_BUDGETS = {
+    'recipes-feed': 8,
+    'recipes-list': 8,
+    'recipes-detail': 7,
+    'recipes-download_shopping_cart': 4,
+    'recipes-favorite': 8,
+    'recipes-shopping_cart': 13,
+    'recipes-create': 24,
+    'recipes-partial_update': 21,
+    'users-list': 4,
+    'users-detail': 4,
+    'users-subscriptions': 8,
+    'users-subscribe': 16,
+}
+# Endpoints with a known per-row query pattern: reported, not failed.
+KNOWN_ISSUES = set()
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database and check SQL query and DB '
+            'time budgets for every route in api/urls.py')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=12)
+        parser.add_argument('--recipes', type=int, default=8,
+                            help='Recipes per author')
+        parser.add_argument('--ingredients', type=int, default=10,
+                            help='Ingredients per recipe')
+
+    def handle(self, *args, **options):
+        self.violations = []
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Budgets count queries on the primary connection only.
+            with override_settings(REPLICA_DATABASES=[]):
+                self.seed(options)
+                self.check_routes()
+                self.check_scaling()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        if self.violations:
+            raise CommandError(
+                'Query budget exceeded:\n' + '\n'.join(self.violations))
+        self.stdout.write(self.style.SUCCESS('All query budgets met.'))
+
+    def seed(self, options):
+        authors = [
+            User.objects.create_user(
+                email=f'author{i}@example.com', username=f'author{i}',
+                first_name='Author', last_name=str(i), password='budget-pw1',
+            )
+            for i in range(options['authors'])
+        ]
+        self.reader = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Reader', last_name='Budget', password='budget-pw1',
+        )
+        self.light_reader = User.objects.create_user(
+            email='light@example.com', username='light',
+            first_name='Light', last_name='Budget', password='budget-pw1',
+        )
+        self.author = authors[0]
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Tag {i}', slug=f'tag{i}') for i in range(6))
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ingredient {i}', measurement_unit='g')
+            for i in range(options['ingredients'] * 4)
+        )
+        per_recipe = options['ingredients']
+        for author_index, author in enumerate(authors):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(name=f'Recipe {author_index}-{i}', text='Text',
+                       cooking_time=10, image='media/recipes/seed.png',
+                       author=author)
+                for i in range(options['recipes'])
+            )
+            for index, recipe in enumerate(recipes):
+                recipe.tags.set(tags[index % 3:index % 3 + 3])
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(
+                        recipe=recipe,
+                        ingredient=ingredients[(index + k) % len(ingredients)],
+                        amount=k + 1,
+                    )
+                    for k in range(per_recipe)
+                )
+        recipes = list(Recipe.objects.order_by('pk'))
+        Favorite.objects.bulk_create(
+            Favorite(user=self.reader, recipe=recipe)
+            for recipe in recipes[::2])
+        ShoppingList.objects.bulk_create(
+            ShoppingList(user=self.reader, recipe=recipe)
+            for recipe in recipes[::2])
+        cart.apply_deltas(cart.drift([self.reader.pk]))
+        ShoppingList.objects.create(user=self.light_reader,
+                                    recipe=recipes[0])
+        Follow.objects.bulk_create(
+            Follow(user=self.reader, author=author) for author in authors)
+        Follow.objects.create(user=self.light_reader, author=self.author)
+        counters.reconcile(counters.drift())
+        feed.rebuild()
+        self.free_recipe = recipes[1]
+        self.tag = tags[0]
+        self.ingredients = ingredients
+        self.clients = {
+            'anonymous': APIClient(),
+            'authenticated': self.client_for(self.reader),
+            'author': self.client_for(self.author),
+        }
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        token = Token.objects.create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        # Measure with the token already in the authentication cache.
+        client.get(reverse('api:users-me'))
+        return client
+
+    def measure(self, client, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, **kwargs)
+        elapsed = sum(float(query['time']) for query in context) * 1000
+        return response, len(context), elapsed
+
+    def assert_budget(self, label, client, method, url, **kwargs):
+        response, queries, elapsed = self.measure(client, method, url,
+                                                  **kwargs)
+        budget = QUERY_BUDGETS.get(label, DEFAULT_QUERY_BUDGET)
+        self.stdout.write(
+            f'{response.status_code} {method.upper():6} {url:55} '
+            f'{queries:3} queries {elapsed:7.1f} ms')
+        if response.status_code >= 500:
+            self.violations.append(
+                f'{label}: {method.upper()} {url} -> '
+                f'{response.status_code}')
+        if queries > budget:
+            self.report(label, f'{method.upper()} {url} made {queries} '
+                               f'queries, budget is {budget}')
+        if elapsed > DEFAULT_TIME_BUDGET_MS:
+            self.report(label, f'{method.upper()} {url} spent {elapsed:.1f} '
+                               f'ms in the database, budget is '
+                               f'{DEFAULT_TIME_BUDGET_MS} ms')
+        return response, queries
+
+    def report(self, label, message):
+        if label in KNOWN_ISSUES:
+            self.stdout.write(self.style.WARNING(f'{label}: {message}'))
+            return
+        self.violations.append(f'{label}: {message}')
+
+    def routes(self, patterns=None):
+        for pattern in patterns or api_urls.urlpatterns:
+            if isinstance(pattern, URLResolver):
+                yield from self.routes(pattern.url_patterns)
+            elif ('format' not in pattern.pattern.regex.groupindex
+                    and getattr(pattern.callback, 'actions', None)):
+                yield pattern
+
+    def kwargs_for(self, pattern):
+        groups = pattern.pattern.regex.groupindex
+        name = pattern.name
+        if 'id' in groups:
+            return {'id': self.author.id}
+        if 'pk' not in groups:
+            return {}
+        if name.startswith('tags'):
+            return {'pk': self.tag.id}
+        if name.startswith('ingredients'):
+            return {'pk': self.ingredients[0].id}
+        return {'pk': self.free_recipe.id}
+
+    def check_routes(self):
+        seen = set()
+        for pattern in self.routes():
+            if pattern.name in seen:
+                continue
+            url = reverse(f'api:{pattern.name}',
+                          kwargs=self.kwargs_for(pattern))
+            if url in seen:
+                continue
+            seen.update((pattern.name, url))
+            actions = pattern.callback.actions
+            if 'get' not in actions:
+                if {'post', 'delete'} <= set(actions):
+                    self.check_toggle(pattern.name, url)
+                continue
+            for client in self.clients.values():
+                self.assert_budget(pattern.name, client, 'get', url)
+        self.check_recipe_writes()
+
+    def check_toggle(self, label, url):
+        client = self.clients['authenticated']
+        if label == 'users-subscribe':
+            Follow.objects.filter(user=self.reader,
+                                  author=self.author).delete()
+        self.assert_budget(label, client, 'post', url)
+        self.assert_budget(label, client, 'delete', url)
+
+    def recipe_payload(self, ingredients=20):
+        return {
+            'name': 'Budget recipe',
+            'text': 'Text',
+            'cooking_time': 5,
+            'image': IMAGE,
+            'tags': [self.tag.id],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 3}
+                for ingredient in self.ingredients[:ingredients]
+            ],
+        }
+
+    def check_recipe_writes(self):
+        client = self.clients['author']
+        response, _ = self.assert_budget(
+            'recipes-create', client, 'post', reverse('api:recipes-list'),
+            data=self.recipe_payload(), format='json')
+        if response.status_code != 201:
+            self.violations.append(
+                f'recipes-create: unexpected {response.status_code}')
+            return
+        payload = self.recipe_payload()
+        payload['ingredients'] = payload['ingredients'][5:] + [
+            {'id': self.ingredients[25].id, 'amount': 1}]
+        self.assert_budget(
+            'recipes-partial_update', client, 'patch',
+            reverse('api:recipes-detail',
+                    kwargs={'pk': response.json()['id']}),
+            data=payload, format='json')
+
+    def check_scaling(self):
+        scenarios = (
+            ('recipes-list', self.clients['authenticated'],
+             reverse('api:recipes-list'), {'limit': 2}, {'limit': 40}),
+            ('users-list', self.clients['authenticated'],
+             reverse('api:users-list'), {'limit': 2}, {'limit': 12}),
+            ('users-subscriptions', self.clients['authenticated'],
+             reverse('api:users-subscriptions'),
+             {'limit': 2, 'recipes_limit': 1},
+             {'limit': 12, 'recipes_limit': 6}),
+        )
+        for label, client, url, small, large in scenarios:
+            self.compare(label,
+                         self.measure(client, 'get', url, data=small)[1],
+                         self.measure(client, 'get', url, data=large)[1])
+        client = self.clients['author']
+        url = reverse('api:recipes-list')
+        self.compare(
+            'recipes-create',
+            self.measure(client, 'post', url, format='json',
+                         data=self.recipe_payload(1))[1],
+            self.measure(client, 'post', url, format='json',
+                         data=self.recipe_payload(30))[1],
+        )
+        url = reverse('api:recipes-download_shopping_cart')
+        self.compare(
+            'recipes-download_shopping_cart',
+            self.measure(self.client_for(self.light_reader), 'get', url)[1],
+            self.measure(self.clients['authenticated'], 'get', url)[1],
+        )
+
+    def compare(self, label, small, large):
+        if small != large:
+            self.report(label, f'query count grows with input size '
+                               f'({small} -> {large})')
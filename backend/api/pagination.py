@@ -1,8 +1,238 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import FieldError, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from foodgram import constants as c
+from recipes import feed
+
+
+def estimate_count(queryset):
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.explain(format='json'))
+    except (DatabaseError, ValueError):
+        return None
+    return plan[0]['Plan']['Plan Rows']
+
+
+def cached_count(queryset):
+    sql, params = queryset.query.sql_with_params()
+    key = 'count:' + hashlib.sha1(
+        f'{queryset.db}:{sql}:{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, c.COUNT_CACHE_TTL)
+    return count
+
+
+class CountingPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= c.COUNT_ESTIMATE_THRESHOLD:
+            return estimate
+        return cached_count(self.object_list)
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = c.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by
+                        or queryset.model._meta.ordering)
+        names = {field.lstrip('-') for field in ordering}
+        if not names & {'pk', 'id'}:
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    def get_page_size(self, request):
+        limit = request.query_params.get(self.page_size_query_param, '')
+        if limit.isdigit() and int(limit) > 0:
+            return int(limit)
+        return self.page_size
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def clean_position(self, queryset, position):
+        try:
+            position = [
+                queryset.query.resolve_ref(
+                    field.lstrip('-')).output_field.to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (FieldError, ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(
+            json.dumps(position, cls=DjangoJSONEncoder).encode()).decode()
+
+    def after(self, position):
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(self.ordering[:index], position):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(
+                self.after(self.clean_position(queryset, position)))
+        limit = self.get_page_size(request)
+        page = list(queryset.order_by(*self.ordering)[:limit + 1])
+        self.next_position = None
+        if len(page) > limit:
+            page = page[:limit]
+            self.next_position = [
+                getattr(page[-1], field.lstrip('-')) for field in self.ordering
+            ]
+        return page
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True,
+                         'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class FeedPagination(KeysetPagination):
+    ordering = ('-pk',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        position = self.decode_cursor(request)
+        before = None
+        if position is not None:
+            before = position[0]
+            if not isinstance(before, int):
+                raise NotFound(self.invalid_cursor_message)
+        limit = self.get_page_size(request)
+        recipe_ids = feed.recipe_ids(request.user.pk, before, limit + 1)
+        self.next_position = None
+        if len(recipe_ids) > limit:
+            recipe_ids = recipe_ids[:limit]
+            self.next_position = [recipe_ids[-1]]
+        return list(queryset.filter(pk__in=recipe_ids).order_by('-pk'))
 
 
 class LimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = c.PAGE_SIZE
+    django_paginator_class = CountingPaginator
+    keyset_class = KeysetPagination
+    count_query_param = 'count'
+    no_count_values = ('0', 'false', 'none')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        self.has_next = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        if (request.query_params.get(self.count_query_param, '').lower()
+                in self.no_count_values):
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_without_count(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        number = request.query_params.get(self.page_query_param, '1')
+        if not number.isdigit() or int(number) < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=number, message='Invalid page.'))
+        self.number = int(number)
+        offset = (self.number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.has_next is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        if self.has_next is None:
+            return super().get_previous_link()
+        url = self.request.build_absolute_uri()
+        if self.number == 1:
+            return None
+        if self.number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param,
+                                   self.number - 1)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if self.has_next is not None:
+            return Response({
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            })
+        return super().get_paginated_response(data)
@@ -1,21 +1,120 @@
+import hashlib
+import os
+
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 from foodgram import constants as c
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            RecipeTags, ShoppingList, Tag)
+from recipes import images
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeCounterShard,
+                            RecipeIngredient, RecipeTags, ShoppingList, Tag,
+                            Upload)
+from recipes.signals import recipe_changed
 from users.models import Follow
 
 User = get_user_model()
 
 
-class SerializerUser(UserSerializer):
+class RenditionsField(serializers.ReadOnlyField):
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return {
+            name: {
+                key: (self.get_url(request, item) if key in images.FORMATS
+                      else item)
+                for key, item in rendition.items()
+            }
+            for name, rendition in value.items() if name != 'source'
+        }
+
+    def get_url(self, request, path):
+        url = default_storage.url(path)
+        return request.build_absolute_uri(url) if request else url
+
+
+class ReleaseReplacedFilesMixin:
+    file_fields = ()
+
+    def update(self, instance, validated_data):
+        previous = {
+            field: getattr(instance, field).name
+            for field in self.file_fields if field in validated_data
+        }
+        instance = super().update(instance, validated_data)
+        for field, name in previous.items():
+            if name:
+                getattr(instance, field).storage.delete(name)
+        return instance
+
+
+class UploadField(serializers.PrimaryKeyRelatedField):
+
+    def get_queryset(self):
+        return Upload.objects.filter(owner=self.context['request'].user)
+
+
+class UploadedImageMixin:
+    upload_fields = {}
+
+    def validate_uploads(self, data):
+        for upload_field, image_field in self.upload_fields.items():
+            if upload_field in data and image_field in data:
+                raise serializers.ValidationError(
+                    f'Send either {image_field} or {upload_field}.')
+
+    def take_uploads(self, validated_data):
+        uploads = []
+        for upload_field, image_field in self.upload_fields.items():
+            upload = validated_data.pop(upload_field, None)
+            if upload is not None:
+                upload.file.open('rb')
+                validated_data[image_field] = File(
+                    upload.file.file, os.path.basename(upload.file.name))
+                uploads.append(upload)
+        return uploads
+
+    def discard_uploads(self, uploads):
+        for upload in uploads:
+            upload.file.close()
+            upload.discard()
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    file = serializers.ImageField()
+
+    class Meta:
+        model = Upload
+        fields = ('id', 'file', 'width', 'height', 'size', 'created')
+        read_only_fields = ('width', 'height', 'size', 'created')
+
+    def create(self, validated_data):
+        file = validated_data['file']
+        width, height = file.image.size
+        upload = Upload.objects.create(
+            owner=self.context['request'].user,
+            file=file,
+            width=width,
+            height=height,
+            size=file.size,
+        )
+        file.close()
+        return upload
+
+
+class SerializerUser(ReleaseReplacedFilesMixin, UserSerializer):
 
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField(allow_null=True, required=False)
+    avatar_renditions = RenditionsField()
+    file_fields = ('avatar',)
 
     class Meta:
         model = User
@@ -27,9 +126,12 @@ class SerializerUser(UserSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_renditions',
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and request.user.follower.filter(author=obj).exists())
@@ -59,12 +161,30 @@ class SerializerUserCreate(UserCreateSerializer):
         )
 
 
-class AvatarSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField(allow_null=True)
+class AvatarSerializer(UploadedImageMixin, ReleaseReplacedFilesMixin,
+                       serializers.ModelSerializer):
+    avatar = Base64ImageField(allow_null=True, required=False)
+    avatar_id = UploadField(required=False, write_only=True,
+                            label='Uploaded avatar')
+    file_fields = ('avatar',)
+    upload_fields = {'avatar_id': 'avatar'}
 
     class Meta:
         model = User
-        fields = ('avatar',)
+        fields = ('avatar', 'avatar_id')
+
+    def validate(self, data):
+        self.validate_uploads(data)
+        if 'avatar' not in data and 'avatar_id' not in data:
+            raise serializers.ValidationError(
+                'Send either avatar or avatar_id.')
+        return data
+
+    def update(self, instance, validated_data):
+        uploads = self.take_uploads(validated_data)
+        instance = super().update(instance, validated_data)
+        self.discard_uploads(uploads)
+        return instance
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -106,11 +226,6 @@ class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
         model = RecipeIngredient
         fields = ('id', 'amount',)
 
-    def validate_id(self, value):
-        if Ingredient.objects.filter(id=value).exists():
-            return value
-        raise serializers.ValidationError()
-
 
 class RecipeReadSerializer(serializers.ModelSerializer):
 
@@ -122,6 +237,9 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    favorites_count = serializers.SerializerMethodField()
+    shopping_cart_count = serializers.SerializerMethodField()
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Recipe
@@ -132,8 +250,13 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'ingredients',
             'is_favorited',
             'is_in_shopping_cart',
+            'favorites_count',
+            'shopping_cart_count',
             'name',
             'image',
+            'image_width',
+            'image_height',
+            'image_renditions',
             'text',
             'cooking_time',
         )
@@ -148,13 +271,23 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return self.check_user_status(obj, Favorite)
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return self.check_user_status(obj, ShoppingList)
 
+    def get_favorites_count(self, obj):
+        return obj.counter_total(RecipeCounterShard.FAVORITES)
 
-class RecipeWriteSerializer(serializers.ModelSerializer):
+    def get_shopping_cart_count(self, obj):
+        return obj.counter_total(RecipeCounterShard.SHOPPING_CART)
+
+
+class RecipeWriteSerializer(UploadedImageMixin, serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
@@ -165,8 +298,15 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         many=True,
     )
     image = Base64ImageField(
-        label='images'
+        label='images',
+        required=False,
+    )
+    image_id = UploadField(
+        label='Uploaded image',
+        required=False,
+        write_only=True,
     )
+    upload_fields = {'image_id': 'image'}
 
     class Meta:
         model = Recipe
@@ -175,14 +315,25 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'ingredients',
             'name',
             'image',
+            'image_id',
             'text',
             'cooking_time',
         )
 
+    def validate_ingredients(self, value):
+        ids = [ingredient['id'] for ingredient in value]
+        found = Ingredient.objects.in_bulk(ids)
+        missing = sorted(set(ids) - found.keys())
+        if missing:
+            raise serializers.ValidationError(
+                f'Unknown ingredient ids: {", ".join(map(str, missing))}.')
+        return value
+
     def validate(self, value):
+        self.validate_uploads(value)
         if 'ingredients' in value and 'tags' in value:
             if (not value['ingredients'] or not value['tags']
-                    or not value['image']):
+                    or not (value.get('image') or value.get('image_id'))):
                 raise serializers.ValidationError()
             ids = {ingredient['id'] for ingredient in value['ingredients']}
             tags = {tag for tag in value['tags']}
@@ -193,8 +344,10 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         raise serializers.ValidationError()
 
     def to_representation(self, instance):
+        request = self.context.get('request')
         serializer = RecipeReadSerializer(
-            instance, context={'request': self.context.get('request')}
+            Recipe.objects.for_read(request.user).get(pk=instance.pk),
+            context={'request': request}
         )
         return serializer.data
 
@@ -202,39 +355,129 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe.tags.set(tags)
 
     def create_ingredients(self, ingredients, recipe):
-        recipe_ingredients = []
-        for ingredient_data in ingredients:
-            ingredient_id = ingredient_data['id']
-            ingredient = Ingredient.objects.get(pk=ingredient_id)
-            amount = ingredient_data['amount']
-            recipe_ingredients.append(
-                RecipeIngredient(ingredient=ingredient,
-                                 recipe=recipe, amount=amount)
-            )
-        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(ingredient_id=ingredient['id'], recipe=recipe,
+                             amount=ingredient['amount'])
+            for ingredient in ingredients
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
+        uploads = self.take_uploads(validated_data)
         user = self.context.get('request').user
         recipe = Recipe.objects.create(**validated_data, author=user)
         self.create_tags(tags, recipe)
         self.create_ingredients(ingredients, recipe)
+        self.discard_uploads(uploads)
         return recipe
 
+    def update_tags(self, recipe, tag_ids):
+        existing = set(RecipeTags.objects.filter(
+            recipe=recipe).order_by().values_list('tag_id', flat=True))
+        added, removed = tag_ids - existing, existing - tag_ids
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag_id=tag_id) for tag_id in added)
+        if removed:
+            RecipeTags.objects.filter(recipe=recipe,
+                                      tag_id__in=removed).delete()
+        return added, removed
+
+    def update_ingredients(self, recipe, amounts):
+        existing = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        added = {pk: amount for pk, amount in amounts.items()
+                 if pk not in existing}
+        removed = {pk: row.amount for pk, row in existing.items()
+                   if pk not in amounts}
+        changed = {pk: (row.amount, amounts[pk])
+                   for pk, row in existing.items()
+                   if pk in amounts and row.amount != amounts[pk]}
+        for pk, (_, amount) in changed.items():
+            existing[pk].amount = amount
+        RecipeIngredient.objects.bulk_update(
+            [existing[pk] for pk in changed], ('amount',))
+        self.create_ingredients(
+            [{'id': pk, 'amount': amount} for pk, amount in added.items()],
+            recipe)
+        if removed:
+            RecipeIngredient.objects.filter(
+                pk__in=[existing[pk].pk for pk in removed]).delete()
+        return added, changed, removed
+
+    @staticmethod
+    def file_digest(file):
+        digest = hashlib.sha256()
+        for chunk in file.chunks():
+            digest.update(chunk)
+        return digest.digest()
+
+    def is_same_image(self, current, upload):
+        try:
+            if not current or current.size != upload.size:
+                return False
+            with current.open('rb'):
+                return self.file_digest(current) == self.file_digest(upload)
+        except (OSError, ValueError):
+            return False
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        RecipeTags.objects.filter(recipe=instance).delete()
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.create_tags(validated_data.pop('tags'), instance)
-        self.create_ingredients(validated_data.pop('ingredients'), instance)
-        return super().update(instance, validated_data)
+        uploads = self.take_uploads(validated_data)
+        tags_added, tags_removed = self.update_tags(
+            instance, {tag.pk for tag in validated_data.pop('tags')})
+        added, changed, removed = self.update_ingredients(instance, {
+            ingredient['id']: ingredient['amount']
+            for ingredient in validated_data.pop('ingredients')
+        })
+        image = validated_data.get('image')
+        if image is not None and self.is_same_image(instance.image, image):
+            validated_data.pop('image')
+        fields = {
+            field: value for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        }
+        if 'image' in fields:
+            previous = instance.image.name
+            instance.image.save(fields['image'].name, fields['image'],
+                                save=False)
+            fields['image'] = instance.image.name
+            instance.image.storage.delete(previous)
+        self.discard_uploads(uploads)
+        if not (fields or tags_added or tags_removed
+                or added or changed or removed):
+            return instance
+        for field, value in fields.items():
+            setattr(instance, field, value)
+        instance.modified = timezone.now()
+        Recipe.objects.filter(pk=instance.pk).update(
+            modified=instance.modified, **fields)
+        recipe_changed.send(
+            sender=Recipe,
+            recipe=instance,
+            fields=set(fields),
+            tags_added=tags_added,
+            tags_removed=tags_removed,
+            ingredients_added=added,
+            ingredients_changed=changed,
+            ingredients_removed=removed,
+        )
+        return instance
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time',)
 
 
 class SubscriberDetailSerializer(SerializerUser):
@@ -246,22 +489,24 @@ class SubscriberDetailSerializer(SerializerUser):
         fields = SerializerUser.Meta.fields + (
             'recipes',
             'recipes_count',
+            'followers_count',
         )
 
     def get_recipes(self, obj):
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit', c.PAGE_SIZE)
-        recipes = obj.recipes.all()
         if str(limit).isdigit() and limit is not None:
-            limit = int(limit)
+            recipes = getattr(obj, 'top_recipes', None)
+            if recipes is None:
+                recipes = obj.recipes.all()[:int(limit)]
             return ShortRecipeSerializer(
-                recipes[:limit],
+                recipes,
                 many=True,
                 context={'request': request},
             ).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class SubscriberSerializer(serializers.ModelSerializer):
@@ -291,10 +536,12 @@ class ShopFavSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='recipe.id')
     name = serializers.ReadOnlyField(source='recipe.name')
     image = Base64ImageField(source='recipe.image')
+    image_renditions = RenditionsField(source='recipe.image_renditions')
 
     class Meta:
         model = Favorite
-        fields = ('user', 'recipe', 'id', 'name', 'image', 'cooking_time',)
+        fields = ('user', 'recipe', 'id', 'name', 'image', 'image_renditions',
+                  'cooking_time',)
 
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import remember_owner
+from api.cache import bump_stamps
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTags, ShoppingList, Tag)
+from recipes.signals import (ingredients_imported, once_per_origin,
+                             recipe_changed, recipes_imported,
+                             renditions_built)
+from users.models import Follow, User
+
+
+def bump_on_commit(*names):
+    transaction.on_commit(lambda: bump_stamps(*names))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver(ingredients_imported)
+def ingredient_changed(**kwargs):
+    bump_on_commit('ingredients', 'recipes')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    bump_on_commit('recipes:list', f'recipes:{instance.pk}')
+
+
+@receiver(recipe_changed)
+def recipe_edited(recipe, **kwargs):
+    bump_on_commit('recipes:list', f'recipes:{recipe.pk}')
+
+
+@receiver(recipes_imported)
+def recipes_bulk_loaded(**kwargs):
+    bump_on_commit('recipes')
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver((post_save, post_delete), sender=RecipeTags)
+def recipe_relation_changed(instance, origin=None, **kwargs):
+    if once_per_origin(origin, ('bump', instance.recipe_id)):
+        bump_on_commit('recipes:list', f'recipes:{instance.recipe_id}')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_set(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_on_commit('recipes:list', f'recipes:{instance.pk}')
+    elif pk_set is None:
+        bump_on_commit('recipes')
+    else:
+        bump_on_commit('recipes:list',
+                       *(f'recipes:{pk}' for pk in pk_set))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    bump_on_commit('tags', 'recipes')
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    if recipe_ids:
+        bump_on_commit('recipes:list',
+                       *(f'recipes:{pk}' for pk in recipe_ids))
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_credentials_changed(instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_on_commit(f'auth:{instance.pk}')
+
+
+@receiver(post_save, sender=Token)
+def token_created(instance, created, **kwargs):
+    if created:
+        remember_owner(instance.key, instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    bump_on_commit(f'auth:{instance.user_id}')
+
+
+@receiver(renditions_built, sender=Recipe)
+def recipe_image_processed(pk, **kwargs):
+    bump_stamps('recipes:list', f'recipes:{pk}')
+
+
+@receiver(renditions_built, sender=User)
+def avatar_processed(pk, **kwargs):
+    bump_stamps(f'auth:{pk}')
+    recipe_ids = list(Recipe.objects.filter(
+        author_id=pk).values_list('id', flat=True))
+    if recipe_ids:
+        bump_stamps('recipes:list',
+                    *(f'recipes:{recipe_id}' for recipe_id in recipe_ids))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingList)
+@receiver((post_save, post_delete), sender=Follow)
+def viewer_state_changed(instance, **kwargs):
+    bump_on_commit(f'viewer:{instance.user_id}')
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingList)
+def recipe_counter_changed(instance, **kwargs):
+    bump_on_commit('recipes:list', f'recipes:{instance.recipe_id}')
@@ -0,0 +1,71 @@
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import (FileUploadHandler,
+                                             TemporaryFileUploadHandler)
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser, DataAndFiles, MultiPartParser
+
+from foodgram import constants as c
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = f'Uploads are limited to {c.UPLOAD_MAX_SIZE} bytes.'
+    default_code = 'upload_too_large'
+
+
+def check_content_length(request, limit):
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length > limit:
+        raise UploadTooLarge()
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > c.UPLOAD_MAX_SIZE:
+            raise UploadTooLarge()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+class LimitedMultiPartParser(MultiPartParser):
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        check_content_length(request, c.UPLOAD_MAX_SIZE
+                             + c.UPLOAD_MULTIPART_OVERHEAD)
+        request.upload_handlers = [
+            SizeLimitUploadHandler(request),
+            TemporaryFileUploadHandler(request),
+        ]
+        return super().parse(stream, media_type, parser_context)
+
+
+class RawImageParser(BaseParser):
+    media_type = 'image/*'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        check_content_length(request, c.UPLOAD_MAX_SIZE)
+        if stream is None:
+            raise ParseError('Empty request body.')
+        content_type = request.content_type
+        extension = content_type.partition('/')[2].partition('+')[0]
+        upload = TemporaryUploadedFile(f'upload.{extension}', content_type,
+                                       0, None)
+        size = 0
+        for chunk in iter(lambda: stream.read(c.UPLOAD_CHUNK_SIZE), b''):
+            size += len(chunk)
+            if size > c.UPLOAD_MAX_SIZE:
+                upload.close()
+                raise UploadTooLarge()
+            upload.write(chunk)
+        upload.size = size
+        upload.seek(0)
+        return DataAndFiles({}, {'file': upload})
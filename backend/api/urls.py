@@ -2,8 +2,9 @@ from django.urls import include, path
 from django.views.generic import TemplateView
 from rest_framework.routers import DefaultRouter
 
+from api import async_views
 from api.views import (ViewSetUser, IngredientViewSet, RecipeViewSet,
-                       TagViewSet)
+                       TagViewSet, UploadViewSet)
 
 app_name = 'api'
 
@@ -11,9 +12,24 @@ router = DefaultRouter()
 router.register('ingredients', IngredientViewSet, 'ingredients')
 router.register('recipes', RecipeViewSet, 'recipes')
 router.register('tags', TagViewSet, 'tags')
+router.register('uploads', UploadViewSet, 'uploads')
 router.register('users', ViewSetUser, 'users')
 
+async_urlpatterns = [
+    path('recipes/', async_views.recipe_list, name='async-recipes-list'),
+    path('recipes/<int:pk>/', async_views.recipe_detail,
+         name='async-recipes-detail'),
+    path('tags/', async_views.tag_list, name='async-tags-list'),
+    path('tags/<int:pk>/', async_views.tag_detail, name='async-tags-detail'),
+    path('ingredients/', async_views.ingredient_list,
+         name='async-ingredients-list'),
+    path('ingredients/<int:pk>/', async_views.ingredient_detail,
+         name='async-ingredients-detail'),
+    path('s/<int:pk>/', async_views.short_url, name='async-short-url'),
+]
+
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('docs/', TemplateView.as_view(template_name='docs/redoc.html'),
@@ -1,29 +1,38 @@
+import hashlib
+
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Prefetch, Value
 from django.shortcuts import get_object_or_404, redirect
 from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import serializers, status, viewsets
+from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import (AllowAny, IsAuthenticated,
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import (AllowAny, IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 
+from api.cache import AnonymousCacheMixin, ConditionalGetMixin
+from api.catalog import ingredient_catalog, payload_response
+from api.export import FORMATS as EXPORT_FORMATS
+from api.export import export_shopping_cart
 from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import LimitPagination
+from api.pagination import FeedPagination, LimitPagination
 from api.permissions import IsAdminAuthorOrReadOnly
 from api.serializers import (AvatarSerializer, FavoriteRecipeSerializer,
-                             IngredientSerializer, RecipeReadSerializer,
-                             RecipeWriteSerializer, SerializerUser,
-                             ShoppingListSerializer,
+                             IngredientSerializer, RecipeImportSerializer,
+                             RecipeReadSerializer, RecipeWriteSerializer,
+                             SerializerUser, ShoppingListSerializer,
                              SubscriberDetailSerializer, SubscriberSerializer,
-                             TagSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingList, Tag)
+                             TagSerializer, UploadSerializer)
+from api.uploads import LimitedMultiPartParser, RawImageParser
+from foodgram import constants as c
+from recipes.importer import RecipeImporter
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingList, Tag,
+                            Upload)
 from users.models import Follow
 
 User = get_user_model()
@@ -35,6 +44,12 @@ class ViewSetUser(UserViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = LimitPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            return queryset.with_is_subscribed(self.request.user)
+        return queryset
+
     @action(['get'], detail=False, permission_classes=(IsAuthenticated,))
     def me(self, request, *args, **kwargs):
         self.get_object = self.get_instance
@@ -50,6 +65,7 @@ class ViewSetUser(UserViewSet):
         serializer = AvatarSerializer(
             instance=request.user,
             data=request.data,
+            context={'request': request},
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -70,7 +86,15 @@ class ViewSetUser(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True))
+        limit = request.query_params.get('recipes_limit', str(c.PAGE_SIZE))
+        if limit.isdigit():
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipes',
+                queryset=Recipe.objects.top_per_author(int(limit)),
+                to_attr='top_recipes',
+            ))
         pages = self.paginate_queryset(queryset)
         serializer = SubscriberDetailSerializer(
             pages,
@@ -103,7 +127,8 @@ class ViewSetUser(UserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(AnonymousCacheMixin, viewsets.ReadOnlyModelViewSet):
+    cache_scope = 'tags'
     permission_classes = (IsAdminAuthorOrReadOnly,)
     pagination_class = None
     queryset = Tag.objects.all()
@@ -118,16 +143,38 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name is not None:
+            return Response(ingredient_catalog.search(name))
+        since = request.query_params.get('since')
+        if since is not None:
+            if not since.isdigit():
+                raise serializers.ValidationError(
+                    {'since': 'Catalog version must be a non-negative '
+                              'integer.'})
+            return Response(ingredient_catalog.changes_since(int(since)))
+        return payload_response(request, ingredient_catalog.get_payload())
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                    viewsets.ModelViewSet):
+    cache_scope = 'recipes'
+    cache_ignored_params = ('is_favorited', 'is_in_shopping_cart')
+    last_modified_field = 'modified'
     permission_classes = (IsAdminAuthorOrReadOnly,)
     queryset = Recipe.objects.all()
     pagination_class = LimitPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve', 'feed'):
+            return Recipe.objects.for_read(self.request.user)
+        return super().get_queryset()
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve', 'get-link'):
+        if self.action in ('list', 'retrieve', 'get-link', 'feed'):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
@@ -183,14 +230,6 @@ class RecipeViewSet(viewsets.ModelViewSet):
         RecipeViewSet.for_del(request, ShoppingList, pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @staticmethod
-    def shopping_list_to_txt(ingredients):
-        return '\n'.join(
-            f'{ingredient["ingredient__name"]} - {ingredient["sum"]} '
-            f'({ingredient["ingredient__measurement_unit"]})'
-            for ingredient in ingredients
-        )
-
     @action(
         detail=False,
         methods=['GET'],
@@ -199,14 +238,54 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='download_shopping_cart',
     )
     def download_shopping_cart(self, request):
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__shopping_lists__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(sum=Sum('amount'))
-        )
-        shopping_list = self.shopping_list_to_txt(ingredients)
-        return HttpResponse(shopping_list, content_type='text/plain')
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in EXPORT_FORMATS:
+            raise serializers.ValidationError(
+                {'file_format': f'Choose one of: {", ".join(EXPORT_FORMATS)}'})
+        return export_shopping_cart(request, file_format)
+
+    @action(
+        detail=False,
+        methods=['POST'],
+        permission_classes=[IsAdminUser],
+        parser_classes=(MultiPartParser,),
+        url_path='import',
+        url_name='import',
+    )
+    def import_recipes(self, request):
+        serializer = RecipeImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+        digest = hashlib.sha256()
+        for chunk in upload.chunks():
+            digest.update(chunk)
+        errors = []
+
+        def report(line, messages):
+            if len(errors) < c.IMPORT_ERRORS_LIMIT:
+                errors.append({'line': line, 'errors': messages})
+
+        progress = RecipeImporter(f'upload:{digest.hexdigest()}',
+                                  report=report).run(upload)
+        return Response({
+            'imported': progress.imported,
+            'failed': progress.failed,
+            'lines': progress.lines,
+            'errors': errors,
+        })
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+        url_path='feed',
+        url_name='feed',
+    )
+    def feed(self, request):
+        paginator = FeedPagination()
+        page = paginator.paginate_queryset(self.get_queryset(), request, self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(
         detail=True,
@@ -225,6 +304,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class UploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                    mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (LimitedMultiPartParser, RawImageParser)
+    serializer_class = UploadSerializer
+
+    def get_queryset(self):
+        return Upload.objects.filter(owner=self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.discard()
+
+
 @require_GET
 def short_url(request, pk):
     try:
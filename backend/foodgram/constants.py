@@ -11,9 +11,52 @@ RECIPE_NAME_MAX_LENGTH = 256
 COOKING_TIME_MIN = 1
 INGREDIENT_NAME_MAX_LENGTH = 128
 MEASUREMENT_UNIT_MAX_LENGTH = 64
+INGREDIENT_CHANGE_ACTION_MAX_LENGTH = 16
+COUNTER_KIND_MAX_LENGTH = 16
+IMPORT_SOURCE_MAX_LENGTH = 255
+STORED_FILE_NAME_MAX_LENGTH = 255
 INGREDIENT_AMOUNT_MIN = 1
+SMALL_INTEGER_MAX = 32767
 FULL_URL_MAX_LENGTH = 256
 SHORT_URL_MAX_LENGTH = 100
 REGEX = r'^[\w.@+-]+$'
 MIN_NUM_ING = 1
 VALIDATE_USERNAME = 'me'
+SEARCH_NGRAM_SIZE = 3
+SEARCH_FUZZY_LIMIT = 10
+SEARCH_FUZZY_THRESHOLD = 0.3
+CATALOG_GZIP_LEVEL = 9
+COUNT_CACHE_TTL = 30
+COUNT_ESTIMATE_THRESHOLD = 10000
+ANONYMOUS_CACHE_TTL = 60 * 10
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_CACHE_TTL = 60 * 60
+EXPORT_PDF_WORKERS = 2
+EXPORT_PDF_FONT_SIZE = 12
+EXPORT_PDF_MARGIN = 50
+COUNTER_SHARD_THRESHOLD = 1000
+COUNTER_SHARDS = 16
+FEED_MAX_ENTRIES = 1000
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+IMPORT_WORKERS = 4
+IMPORT_POOL_THRESHOLD = 200
+IMPORT_ERRORS_LIMIT = 100
+IMAGE_WORKERS = 2
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_RENDITIONS = {
+    'recipe': {'thumbnail': (480, 480), 'detail': (1280, 1280)},
+    'user': {'avatar': (256, 256)},
+}
+STORAGE_HASH_CHUNK_SIZE = 64 * 1024
+STORAGE_SHARD_LEVELS = 2
+STORAGE_SHARD_WIDTH = 2
+UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+UPLOAD_MULTIPART_OVERHEAD = 64 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_TTL = 60 * 60 * 24
+REPLICA_PIN_SECONDS = 5
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 60
+TOKEN_OWNER_TTL = 60 * 60 * 24
@@ -0,0 +1,104 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from foodgram import constants as c
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_pin'
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if (not replicas or not _read_from_replica.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def pin_key(request):
+    credential = (request.headers.get('Authorization')
+                  or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    if not credential:
+        return None
+    return f'db-pin:{hashlib.sha1(credential.encode()).hexdigest()}'
+
+
+def reads_from_replica(request):
+    return (bool(settings.REPLICA_DATABASES)
+            and request.method in SAFE_METHODS
+            and request.path.startswith('/api/')
+            and PIN_COOKIE not in request.COOKIES)
+
+
+def should_pin(request, response):
+    return (bool(settings.REPLICA_DATABASES)
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400)
+
+
+def pin(response):
+    response.set_cookie(PIN_COOKIE, '1', max_age=c.REPLICA_PIN_SECONDS,
+                        httponly=True, samesite='Lax')
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = pin_key(request)
+        replica = reads_from_replica(request)
+        if replica and key is not None:
+            replica = not cache.get(key)
+        token = _read_from_replica.set(replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        if should_pin(request, response):
+            if key is not None:
+                cache.set(key, True, c.REPLICA_PIN_SECONDS)
+            pin(response)
+        return response
+
+    async def __acall__(self, request):
+        key = pin_key(request)
+        replica = reads_from_replica(request)
+        if replica and key is not None:
+            replica = not await cache.aget(key)
+        token = _read_from_replica.set(replica)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        if should_pin(request, response):
+            if key is not None:
+                await cache.aset(key, True, c.REPLICA_PIN_SECONDS)
+            pin(response)
+        return response
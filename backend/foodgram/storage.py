@@ -0,0 +1,66 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from foodgram import constants as c
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def __init__(self, prefix='media', **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(c.STORAGE_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        width = c.STORAGE_SHARD_WIDTH
+        shards = [digest[level * width:(level + 1) * width]
+                  for level in range(c.STORAGE_SHARD_LEVELS)]
+        extension = os.path.splitext(name)[1].lower()
+        return '/'.join((self.prefix, *shards, digest + extension))
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def acquire(self, name, size, count=1):
+        from recipes.models import StoredFile
+
+        StoredFile.objects.bulk_create(
+            (StoredFile(name=name, size=size),), ignore_conflicts=True)
+        StoredFile.objects.filter(name=name).update(
+            references=F('references') + count)
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        with transaction.atomic(savepoint=False):
+            self.acquire(name, content.size)
+            if not self.exists(name):
+                temporary = super()._save(
+                    f'{name}.{uuid.uuid4().hex}.tmp', content)
+                os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def delete(self, name):
+        from recipes.models import StoredFile
+
+        if not name:
+            return
+        if StoredFile.objects.filter(name=name, references__gt=0).update(
+                references=F('references') - 1):
+            transaction.on_commit(lambda: self.purge(name))
+
+    def purge(self, name):
+        from recipes.models import StoredFile
+
+        with transaction.atomic():
+            deleted, _ = StoredFile.objects.filter(
+                name=name, references=0).delete()
+            if deleted:
+                super().delete(name)
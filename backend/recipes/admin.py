@@ -24,11 +24,17 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'text', 'author')
+    list_display = ('id', 'name', 'text', 'author', 'favorites_count')
     search_fields = ('name', 'author__username')
     inlines = (RecipeIngredientsInLine, RecipeTagsInLine)
     empty_value_display = '-empty-'
 
+    def save_model(self, request, obj, form, change):
+        previous = form.initial.get('image')
+        super().save_model(request, obj, form, change)
+        if change and previous and 'image' in form.changed_data:
+            obj.image.storage.delete(previous.name)
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
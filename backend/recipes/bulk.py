@@ -0,0 +1,113 @@
+import base64
+import binascii
+import io
+import json
+from datetime import date, datetime
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from PIL import Image
+
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def adapt_json(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def copy_value(value):
+    value = adapt_json(value)
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_text(rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(map(copy_value, row)))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def copy_into(table, columns, rows, using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    sql = (f'COPY {quote(table)} ({", ".join(map(quote, columns))}) '
+           f'FROM STDIN')
+    with connection.cursor() as cursor:
+        driver_cursor = cursor.cursor
+        if hasattr(driver_cursor, 'copy'):
+            with driver_cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(tuple(map(adapt_json, row)))
+        else:
+            driver_cursor.copy_expert(sql, copy_text(rows))
+
+
+def copy_rows(model, fields, rows, using=DEFAULT_DB_ALIAS):
+    rows = list(rows)
+    if not rows:
+        return
+    if connections[using].vendor != 'postgresql':
+        model.objects.using(using).bulk_create(
+            model(**{model._meta.get_field(field).attname: value
+                     for field, value in zip(fields, row)})
+            for row in rows
+        )
+        return
+    copy_into(model._meta.db_table,
+              [model._meta.get_field(field).column for field in fields],
+              rows, using)
+
+
+def reserve_ids(model, count, using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def insert_rows(model, fields, rows, using=DEFAULT_DB_ALIAS):
+    rows = list(rows)
+    if not rows:
+        return []
+    if connections[using].vendor != 'postgresql':
+        objs = model.objects.using(using).bulk_create(
+            model(**{model._meta.get_field(field).attname: value
+                     for field, value in zip(fields, row)})
+            for row in rows
+        )
+        return [obj.pk for obj in objs]
+    ids = reserve_ids(model, len(rows), using)
+    copy_rows(model, ('id', *fields),
+              ((pk, *row) for pk, row in zip(ids, rows)), using)
+    return ids
+
+
+def decode_image(value):
+    try:
+        if not isinstance(value, str) or ';base64,' not in value:
+            raise ValueError('Expected a base64 data URI.')
+        content = base64.b64decode(value.partition(';base64,')[2],
+                                   validate=True)
+        with Image.open(io.BytesIO(content)) as image:
+            image.verify()
+            extension = image.format.lower()
+    except (binascii.Error, OSError, ValueError) as error:
+        return None, str(error) or error.__class__.__name__
+    return (extension, content), None
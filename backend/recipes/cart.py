@@ -0,0 +1,110 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, ShoppingCartItem, ShoppingList
+
+
+def recipe_amounts(recipe_id):
+    return dict(RecipeIngredient.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', 'amount'))
+
+
+def cart_user_ids(recipe_id):
+    return list(ShoppingList.objects.filter(
+        recipe_id=recipe_id).order_by().values_list('user_id', flat=True))
+
+
+def _apply_deltas(deltas):
+    items = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingCartItem.objects.select_for_update().filter(
+            user_id__in={user_id for user_id, _ in deltas},
+            ingredient_id__in={ingredient_id for _, ingredient_id in deltas},
+        )
+    }
+    created, updated, deleted = [], [], []
+    for (user_id, ingredient_id), delta in deltas.items():
+        item = items.get((user_id, ingredient_id))
+        if item is None:
+            if delta > 0:
+                created.append(ShoppingCartItem(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    total=delta))
+            continue
+        item.total += delta
+        if item.total > 0:
+            updated.append(item)
+        else:
+            deleted.append(item.pk)
+    ShoppingCartItem.objects.bulk_create(created)
+    ShoppingCartItem.objects.bulk_update(updated, ('total',))
+    ShoppingCartItem.objects.filter(pk__in=deleted).delete()
+
+
+def apply_deltas(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    try:
+        with transaction.atomic():
+            _apply_deltas(deltas)
+    except IntegrityError:
+        with transaction.atomic():
+            _apply_deltas(deltas)
+
+
+def add_recipe(user_id, recipe_id, sign=1):
+    apply_deltas({
+        (user_id, ingredient_id): sign * amount
+        for ingredient_id, amount in recipe_amounts(recipe_id).items()
+    })
+
+
+def remove_recipe(user_id, recipe_id):
+    add_recipe(user_id, recipe_id, sign=-1)
+
+
+def change_recipe_ingredients(recipe_id, amounts):
+    user_ids = cart_user_ids(recipe_id)
+    apply_deltas({
+        (user_id, ingredient_id): delta
+        for user_id in user_ids
+        for ingredient_id, delta in amounts.items()
+    })
+
+
+def expected_totals(user_ids=None):
+    carts = ShoppingList.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+    rows = carts.values_list(
+        'user_id', 'recipe__recipe_ingredients__ingredient_id'
+    ).annotate(total=Sum('recipe__recipe_ingredients__amount')).order_by()
+    return Counter({
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in rows
+        if ingredient_id is not None
+    })
+
+
+def stored_totals(user_ids=None):
+    items = ShoppingCartItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    return Counter({
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in items.values_list(
+            'user_id', 'ingredient_id', 'total')
+    })
+
+
+def drift(user_ids=None):
+    expected = expected_totals(user_ids)
+    stored = stored_totals(user_ids)
+    return {
+        key: expected[key] - stored[key]
+        for key in expected.keys() | stored.keys()
+        if expected[key] != stored[key]
+    }
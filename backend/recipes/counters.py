@@ -0,0 +1,95 @@
+import random
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from foodgram import constants as c
+from recipes.models import Favorite, Recipe, RecipeCounterShard, ShoppingList
+from users.models import Follow, User
+
+RECIPE_COUNTERS = {
+    Favorite: RecipeCounterShard.FAVORITES,
+    ShoppingList: RecipeCounterShard.SHOPPING_CART,
+}
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingList, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def adjust(model, pk, field, delta, **filters):
+    return model.objects.filter(pk=pk, **filters).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def add_to_shard(recipe_id, kind, delta):
+    shard = random.randrange(c.COUNTER_SHARDS)
+    shards = RecipeCounterShard.objects.filter(
+        recipe_id=recipe_id, kind=kind, shard=shard)
+    if shards.update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic():
+            RecipeCounterShard.objects.create(
+                recipe_id=recipe_id, kind=kind, shard=shard, value=delta)
+    except IntegrityError:
+        shards.update(value=F('value') + delta)
+
+
+def change_recipe_counter(recipe_id, kind, delta, sharded=True):
+    field = f'{kind}_count'
+    if not sharded:
+        adjust(Recipe, recipe_id, field, delta)
+    elif not adjust(Recipe, recipe_id, field, delta,
+                    **{f'{field}__lt': c.COUNTER_SHARD_THRESHOLD}):
+        add_to_shard(recipe_id, kind, delta)
+
+
+def change_user_counter(user_id, field, delta):
+    adjust(User, user_id, field, delta)
+
+
+def count_of(model, related):
+    return Coalesce(Subquery(
+        model.objects.filter(**{related: OuterRef('pk')}).order_by()
+        .values(related).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def drift():
+    rows = []
+    for model, field, source, related in COUNTERS:
+        stored = field
+        queryset = model.objects.all()
+        if model is Recipe:
+            stored = field.replace('_count', '_total')
+            queryset = queryset.with_counters()
+        rows.extend(
+            (model, pk, field, value, actual)
+            for pk, value, actual in queryset.annotate(
+                actual=count_of(source, related)
+            ).exclude(**{stored: F('actual')}).values_list(
+                'pk', stored, 'actual')
+        )
+    return rows
+
+
+def reconcile(rows):
+    pks = defaultdict(set)
+    for model, pk, field, _, _ in rows:
+        pks[model, field].add(pk)
+    with transaction.atomic():
+        for model, field, source, related in COUNTERS:
+            if (model, field) not in pks:
+                continue
+            if model is Recipe:
+                RecipeCounterShard.objects.filter(
+                    recipe__in=pks[model, field],
+                    kind=field.replace('_count', ''),
+                ).delete()
+            model.objects.filter(pk__in=pks[model, field]).update(
+                **{field: count_of(source, related)})
@@ -0,0 +1,131 @@
+from collections import defaultdict
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from foodgram import constants as c
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow, User
+
+
+def is_popular(author_id):
+    return User.objects.filter(
+        pk=author_id,
+        followers_count__gte=c.FEED_FANOUT_MAX_FOLLOWERS,
+    ).exists()
+
+
+def popular_author_ids(user_id):
+    return list(Follow.objects.filter(
+        user_id=user_id,
+        author__followers_count__gte=c.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values_list('author_id', flat=True))
+
+
+def trim(user_ids):
+    overflow = FeedEntry.objects.filter(user_id__in=user_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('user'),
+                    order_by=F('recipe').desc()),
+    ).filter(rank__gt=c.FEED_MAX_ENTRIES).values_list('pk', flat=True)
+    overflow = list(overflow)
+    if overflow:
+        FeedEntry.objects.filter(pk__in=overflow).delete()
+
+
+def push(entries, user_ids):
+    FeedEntry.objects.bulk_create(entries, batch_size=c.FEED_BATCH_SIZE,
+                                  ignore_conflicts=True)
+    trim(user_ids)
+
+
+def fan_out(recipe_id, author_id):
+    if is_popular(author_id):
+        return
+    follower_ids = list(Follow.objects.filter(
+        author_id=author_id).order_by().values_list('user_id', flat=True))
+    for start in range(0, len(follower_ids), c.FEED_BATCH_SIZE):
+        batch = follower_ids[start:start + c.FEED_BATCH_SIZE]
+        push([FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                        author_id=author_id) for user_id in batch], batch)
+
+
+def fan_out_many(recipes):
+    recipe_ids = defaultdict(list)
+    for recipe_id, author_id in recipes:
+        recipe_ids[author_id].append(recipe_id)
+    follows = Follow.objects.filter(
+        author_id__in=recipe_ids,
+        author__followers_count__lt=c.FEED_FANOUT_MAX_FOLLOWERS,
+    ).order_by().values_list('user_id', 'author_id')
+    user_ids = set()
+    entries = []
+    for user_id, author_id in follows.iterator():
+        user_ids.add(user_id)
+        entries.extend(
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id)
+            for recipe_id in recipe_ids[author_id]
+        )
+        if len(entries) >= c.FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    if user_ids:
+        trim(user_ids)
+
+
+def backfill(user_id, author_id):
+    if is_popular(author_id):
+        return
+    recipe_ids = Recipe.objects.filter(author_id=author_id).order_by(
+        '-pk').values_list('pk', flat=True)[:c.FEED_MAX_ENTRIES]
+    push([FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                    author_id=author_id) for recipe_id in recipe_ids],
+         [user_id])
+
+
+def prune(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    FeedEntry.objects.all().delete()
+    follows = Follow.objects.filter(
+        author__followers_count__lt=c.FEED_FANOUT_MAX_FOLLOWERS,
+    ).order_by('user_id').values_list('user_id', 'author_id')
+    followers = defaultdict(list)
+    for user_id, author_id in follows.iterator():
+        followers[author_id].append(user_id)
+    entries = []
+    for author_id, recipe_id in Recipe.objects.filter(
+            author_id__in=followers).values_list('author_id', 'pk').iterator():
+        entries.extend(
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id)
+            for user_id in followers[author_id]
+        )
+        if len(entries) >= c.FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(entries)
+            entries = []
+    FeedEntry.objects.bulk_create(entries)
+    user_ids = {user_id for users in followers.values() for user_id in users}
+    trim(user_ids)
+
+
+def recipe_ids(user_id, before=None, limit=c.PAGE_SIZE):
+    timeline = FeedEntry.objects.filter(user_id=user_id)
+    if before is not None:
+        timeline = timeline.filter(recipe_id__lt=before)
+    ids = list(timeline.order_by('-recipe_id').values_list(
+        'recipe_id', flat=True)[:limit])
+    popular = popular_author_ids(user_id)
+    if popular:
+        pulled = Recipe.objects.filter(author_id__in=popular)
+        if before is not None:
+            pulled = pulled.filter(pk__lt=before)
+        ids = sorted(
+            set(ids).union(pulled.order_by('-pk').values_list(
+                'pk', flat=True)[:limit]),
+            reverse=True,
+        )[:limit]
+    return ids
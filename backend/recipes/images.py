@@ -0,0 +1,117 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from foodgram import constants as c
+
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=c.IMAGE_WORKERS)
+    return _executor
+
+
+def is_stale(instance, field):
+    file = getattr(instance, field)
+    renditions = getattr(instance, f'{field}_renditions')
+    if not file:
+        return bool(renditions)
+    return renditions.get('source') != file.name
+
+
+def schedule(model, field, pks):
+    pks = list(pks)
+    transaction.on_commit(lambda: [
+        get_executor().submit(build, model, field, pk) for pk in pks
+    ])
+
+
+def render(content, sizes):
+    with Image.open(io.BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert(
+                'RGBA' if image.mode in ('LA', 'PA')
+                or 'transparency' in image.info else 'RGB')
+        results = []
+        for name, size in sizes.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            for extension, file_format in FORMATS.items():
+                frame = resized
+                if file_format == 'JPEG' and frame.mode != 'RGB':
+                    frame = frame.convert('RGB')
+                buffer = io.BytesIO()
+                frame.save(buffer, file_format,
+                           quality=c.IMAGE_RENDITION_QUALITY, optimize=True)
+                results.append((name, extension, resized.size,
+                                buffer.getvalue()))
+        return image.size, results
+
+
+def rendition_paths(renditions):
+    return [
+        path
+        for name, rendition in renditions.items() if name != 'source'
+        for extension, path in rendition.items() if extension in FORMATS
+    ]
+
+
+def save_renditions(source, results):
+    stem = os.path.splitext(source)[0]
+    renditions = {'source': source}
+    for name, extension, (width, height), content in results:
+        rendition = renditions.setdefault(
+            name, {'width': width, 'height': height})
+        rendition[extension] = default_storage.save(
+            f'{stem}.{name}.{extension}', ContentFile(content))
+    return renditions
+
+
+def build(model, field, pk):
+    from recipes.signals import renditions_built
+
+    close_old_connections()
+    try:
+        instance = model.objects.filter(pk=pk).only(
+            field, f'{field}_renditions').first()
+        if instance is None or not is_stale(instance, field):
+            return
+        file = getattr(instance, field)
+        values = {f'{field}_width': None, f'{field}_height': None,
+                  f'{field}_renditions': {}}
+        if file:
+            with file.open('rb'):
+                content = file.read()
+            (width, height), results = render(
+                content, c.IMAGE_RENDITIONS[model._meta.model_name])
+            values = {f'{field}_width': width, f'{field}_height': height,
+                      f'{field}_renditions': save_renditions(file.name,
+                                                             results)}
+        previous = getattr(instance, f'{field}_renditions')
+        current = Q(**{field: file.name})
+        if not file:
+            current = Q(**{field: ''}) | Q(**{f'{field}__isnull': True})
+        if model.objects.filter(current, pk=pk).update(**values):
+            obsolete = rendition_paths(previous)
+            renditions_built.send(sender=model, pk=pk, field=field)
+        else:
+            obsolete = rendition_paths(values[f'{field}_renditions'])
+        for path in obsolete:
+            default_storage.delete(path)
+    finally:
+        close_old_connections()
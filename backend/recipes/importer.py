@@ -0,0 +1,222 @@
+import json
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from foodgram import constants as c
+from recipes import bulk, counters, feed, images
+from recipes.models import (Ingredient, Recipe, RecipeImport, RecipeIngredient,
+                            RecipeTags, Tag)
+from recipes.signals import recipes_imported
+from users.models import User
+
+_executors = {}
+
+
+def get_executor(workers):
+    if workers not in _executors:
+        _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _executors[workers]
+
+
+RECIPE_FIELDS = ('name', 'text', 'cooking_time', 'image', 'image_width',
+                 'image_height', 'image_renditions', 'author', 'modified',
+                 'favorites_count', 'shopping_cart_count')
+
+
+class RowError(ValueError):
+    pass
+
+
+def is_integer(value, minimum):
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and minimum <= value <= c.SMALL_INTEGER_MAX)
+
+
+class RecipeImporter:
+
+    def __init__(self, source, batch_size=c.IMPORT_BATCH_SIZE,
+                 workers=c.IMPORT_WORKERS, report=None):
+        self.source = source
+        self.batch_size = batch_size
+        self.workers = workers
+        self.report = report
+        self.authors = {}
+        for pk, email, username in User.objects.values_list(
+                'pk', 'email', 'username'):
+            self.authors[email] = self.authors[username] = pk
+        self.tags = dict(Tag.objects.values_list('slug', 'pk'))
+        self.ingredients = dict(Ingredient.objects.values_list('name', 'pk'))
+        self.ingredient_ids = set(self.ingredients.values())
+
+    def batches(self, file, position):
+        file.seek(position)
+        batch = []
+        for line in iter(file.readline, b''):
+            position += len(line)
+            batch.append(line)
+            if len(batch) >= self.batch_size:
+                yield batch, position
+                batch = []
+        if batch:
+            yield batch, position
+
+    def resolve_ingredient(self, item):
+        if not isinstance(item, dict):
+            return None
+        if 'id' in item:
+            return item['id'] if item['id'] in self.ingredient_ids else None
+        return self.ingredients.get(item.get('name'))
+
+    def parse_tags(self, tags, errors):
+        if not isinstance(tags, list) or not tags:
+            errors.append('tags: Expected a non-empty list of slugs.')
+            return set()
+        unknown = [slug for slug in tags
+                   if not isinstance(slug, str) or slug not in self.tags]
+        if unknown:
+            errors.append(f'tags: Unknown tags {unknown!r}.')
+        return {self.tags[slug] for slug in tags if slug not in unknown}
+
+    def parse_ingredients(self, ingredients, errors):
+        if not isinstance(ingredients, list) or not ingredients:
+            errors.append('ingredients: Expected a non-empty list.')
+            return {}
+        amounts = {}
+        for index, item in enumerate(ingredients):
+            ingredient_id = self.resolve_ingredient(item)
+            if ingredient_id is None:
+                errors.append(f'ingredients[{index}]: Unknown ingredient.')
+            elif not is_integer(item.get('amount'), c.INGREDIENT_AMOUNT_MIN):
+                errors.append(f'ingredients[{index}]: Expected an integer '
+                              f'amount of at least {c.INGREDIENT_AMOUNT_MIN}.')
+            elif ingredient_id in amounts:
+                errors.append(f'ingredients[{index}]: Duplicate ingredient.')
+            else:
+                amounts[ingredient_id] = item['amount']
+        return amounts
+
+    def parse(self, line):
+        try:
+            data = json.loads(line)
+        except ValueError as error:
+            raise RowError([f'Invalid JSON: {error}.'])
+        if not isinstance(data, dict):
+            raise RowError(['Expected a JSON object.'])
+        errors = []
+        name = data.get('name')
+        if (not isinstance(name, str) or not name.strip()
+                or len(name) > c.RECIPE_NAME_MAX_LENGTH):
+            errors.append('name: Expected a non-empty string of at most '
+                          f'{c.RECIPE_NAME_MAX_LENGTH} characters.')
+        if not isinstance(data.get('text'), str) or not data['text'].strip():
+            errors.append('text: Expected a non-empty string.')
+        if not is_integer(data.get('cooking_time'), c.COOKING_TIME_MIN):
+            errors.append('cooking_time: Expected an integer of at least '
+                          f'{c.COOKING_TIME_MIN}.')
+        author = self.authors.get(data.get('author'))
+        if author is None:
+            errors.append(f'author: Unknown user {data.get("author")!r}.')
+        tag_ids = self.parse_tags(data.get('tags'), errors)
+        amounts = self.parse_ingredients(data.get('ingredients'), errors)
+        if not isinstance(data.get('image'), str):
+            errors.append('image: Expected a base64 data URI.')
+        if errors:
+            raise RowError(errors)
+        return {
+            'name': name,
+            'text': data['text'],
+            'cooking_time': data['cooking_time'],
+            'author': author,
+            'tags': tag_ids,
+            'ingredients': amounts,
+            'image': data['image'],
+        }
+
+    def fail(self, line, errors):
+        self.failed += 1
+        if self.report is not None:
+            self.report(line, errors)
+
+    def decode_images(self, values):
+        if self.workers < 2 or len(values) < c.IMPORT_POOL_THRESHOLD:
+            return map(bulk.decode_image, values)
+        return get_executor(self.workers).map(
+            bulk.decode_image, values,
+            chunksize=max(1, len(values) // (self.workers * 4)))
+
+    def import_batch(self, lines, first_line):
+        records = []
+        for number, line in enumerate(lines, first_line):
+            if not line.strip():
+                continue
+            try:
+                records.append((number, self.parse(line)))
+            except RowError as error:
+                self.fail(number, error.args[0])
+        images = self.decode_images(
+            [record['image'] for _, record in records])
+        valid = []
+        for (number, record), (image, error) in zip(records, images):
+            if error is not None:
+                self.fail(number, [f'image: {error}'])
+                continue
+            record['image'] = image
+            valid.append(record)
+        self.save(valid)
+        return len(valid)
+
+    def save(self, records):
+        now = timezone.now()
+        recipe_ids = bulk.insert_rows(Recipe, RECIPE_FIELDS, (
+            (record['name'], record['text'], record['cooking_time'],
+             default_storage.save(
+                 f'media/recipes/{uuid.uuid4()}.{record["image"][0]}',
+                 ContentFile(record['image'][1])),
+             None, None, {}, record['author'], now, 0, 0)
+            for record in records
+        ))
+        bulk.copy_rows(RecipeTags, ('recipe', 'tag'), (
+            (recipe_id, tag_id)
+            for recipe_id, record in zip(recipe_ids, records)
+            for tag_id in record['tags']
+        ))
+        bulk.copy_rows(RecipeIngredient, ('recipe', 'ingredient', 'amount'), (
+            (recipe_id, ingredient_id, amount)
+            for recipe_id, record in zip(recipe_ids, records)
+            for ingredient_id, amount in record['ingredients'].items()
+        ))
+        images.schedule(Recipe, 'image', recipe_ids)
+        for author_id, count in Counter(
+                record['author'] for record in records).items():
+            counters.change_user_counter(author_id, 'recipes_count', count)
+        published = [(recipe_id, record['author'])
+                     for recipe_id, record in zip(recipe_ids, records)]
+        transaction.on_commit(lambda: feed.fan_out_many(published))
+
+    def run(self, file, restart=False):
+        progress, _ = RecipeImport.objects.get_or_create(source=self.source)
+        if restart:
+            progress.position = progress.lines = 0
+            progress.imported = progress.failed = 0
+            progress.save()
+        imported = 0
+        for lines, position in self.batches(file, progress.position):
+            self.failed = 0
+            with transaction.atomic():
+                count = self.import_batch(lines, progress.lines + 1)
+                progress.position = position
+                progress.lines += len(lines)
+                progress.imported += count
+                progress.failed += self.failed
+                progress.save()
+            imported += count
+        if imported:
+            recipes_imported.send(sender=Recipe, source=self.source,
+                                  imported=imported)
+        return progress
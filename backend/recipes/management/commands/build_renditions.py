@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from recipes import images
+from recipes.models import Recipe
+from users.models import User
+
+SOURCES = (
+    (Recipe, 'image'),
+    (User, 'avatar'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Build resized renditions for recipe images and avatars that '
+            'are missing or out of date')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Report stale images without building them')
+
+    def handle(self, *args, **options):
+        for model, field in SOURCES:
+            pks = [
+                instance.pk
+                for instance in model.objects.only(
+                    field, f'{field}_renditions').iterator()
+                if images.is_stale(instance, field)
+            ]
+            label = model._meta.verbose_name_plural
+            if options['verify']:
+                self.stdout.write(f'{label}: {len(pks)} stale.')
+                continue
+            for pk in pks:
+                try:
+                    images.build(model, field, pk)
+                except (OSError, ValueError) as error:
+                    self.stdout.write(f'{label} {pk}: {error}')
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: {len(pks)} processed.'))
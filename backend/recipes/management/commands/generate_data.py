@@ -0,0 +1,187 @@
+import base64
+import itertools
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tqdm import tqdm
+
+from recipes import cart, counters, feed
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTags, ShoppingList, Tag)
+from users.models import Follow, User
+
+PLACEHOLDER_IMAGE = 'media/recipes/synthetic.png'
+PLACEHOLDER_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8'
+    '/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=='
+)
+
+
+class ZipfSampler:
+
+    def __init__(self, population, exponent):
+        self.population = population
+        self.cum_weights = list(itertools.accumulate(
+            1 / rank ** exponent for rank in range(1, len(population) + 1)
+        ))
+
+    def sample(self, k=1):
+        return random.choices(self.population, cum_weights=self.cum_weights,
+                              k=k)
+
+    def unique(self, k):
+        k = min(k, len(self.population))
+        chosen = set()
+        while len(chosen) < k:
+            chosen.update(self.sample(k - len(chosen)))
+        return chosen
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with synthetic users, recipes, tags, '
+            'favorites, shopping lists and follows')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=12)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--shopping-lists', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Exponent of the popularity distribution')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, help='Random seed')
+
+    def handle(self, *args, **options):
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        self.exponent = options['zipf']
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('No ingredients found, run import_data first.')
+        random.shuffle(ingredient_ids)
+        self.ingredients = ZipfSampler(ingredient_ids, self.exponent)
+        self.run = uuid.uuid4().hex[:8]
+        self.image = default_storage.save(PLACEHOLDER_IMAGE,
+                                          ContentFile(PLACEHOLDER_PNG))
+
+        user_ids = self.create_users(options['users'])
+        tag_ids = self.create_tags(options['tags'])
+        recipe_ids = self.create_recipes(
+            options['recipes'], user_ids, tag_ids,
+            options['ingredients_per_recipe'], options['tags_per_recipe'],
+        )
+        default_storage.delete(self.image)
+        self.create_pairs(Favorite, 'recipe', options['favorites'],
+                          user_ids, recipe_ids)
+        self.create_pairs(ShoppingList, 'recipe', options['shopping_lists'],
+                          user_ids, recipe_ids)
+        cart.apply_deltas(cart.drift(user_ids))
+        self.create_pairs(Follow, 'author', options['follows'],
+                          user_ids, user_ids)
+        counters.reconcile(counters.drift())
+        feed.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(user_ids)} users and {len(recipe_ids)} '
+            f'recipes (run {self.run}).'))
+
+    def batches(self, total, desc):
+        for start in tqdm(range(0, total, self.batch_size), desc=desc,
+                          unit_scale=self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def create_users(self, total):
+        password = make_password('synthetic-password')
+        user_ids = []
+        for batch in self.batches(total, 'Users'):
+            users = User.objects.bulk_create(
+                User(
+                    email=f'{self.run}.{i}@synthetic.example',
+                    username=f'synthetic_{self.run}_{i}',
+                    first_name='Synthetic',
+                    last_name=f'User {i}',
+                    password=password,
+                )
+                for i in batch
+            )
+            user_ids.extend(user.pk for user in users)
+        random.shuffle(user_ids)
+        return user_ids
+
+    def create_tags(self, total):
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Tag {self.run} {i}', slug=f'{self.run}_{i}')
+            for i in range(total)
+        )
+        return [tag.pk for tag in tags]
+
+    def create_recipes(self, total, user_ids, tag_ids, ingredients_per_recipe,
+                       tags_per_recipe):
+        authors = ZipfSampler(user_ids, self.exponent)
+        tags = ZipfSampler(tag_ids, self.exponent)
+        recipe_ids = []
+        for batch in self.batches(total, 'Recipes'):
+            with transaction.atomic():
+                recipes = Recipe.objects.bulk_create(
+                    Recipe(
+                        name=f'Synthetic recipe {self.run} {i}',
+                        text='Synthetic recipe description.',
+                        cooking_time=random.randint(5, 180),
+                        image=self.image,
+                        author_id=author_id,
+                    )
+                    for i, author_id in zip(batch,
+                                            authors.sample(len(batch)))
+                )
+                default_storage.acquire(self.image, len(PLACEHOLDER_PNG),
+                                        len(recipes))
+                recipe_ingredients = []
+                recipe_tags = []
+                for recipe in recipes:
+                    count = max(1, int(random.gauss(ingredients_per_recipe,
+                                                    ingredients_per_recipe
+                                                    / 3)))
+                    recipe_ingredients.extend(
+                        RecipeIngredient(recipe_id=recipe.pk,
+                                         ingredient_id=ingredient_id,
+                                         amount=random.randint(1, 500))
+                        for ingredient_id in self.ingredients.unique(count)
+                    )
+                    recipe_tags.extend(
+                        RecipeTags(recipe_id=recipe.pk, tag_id=tag_id)
+                        for tag_id in tags.unique(tags_per_recipe)
+                    )
+                RecipeIngredient.objects.bulk_create(
+                    recipe_ingredients, batch_size=self.batch_size)
+                RecipeTags.objects.bulk_create(
+                    recipe_tags, batch_size=self.batch_size)
+            recipe_ids.extend(recipe.pk for recipe in recipes)
+        random.shuffle(recipe_ids)
+        return recipe_ids
+
+    def create_pairs(self, model, target_field, total, user_ids, target_ids):
+        if not total or not target_ids:
+            return
+        targets = ZipfSampler(target_ids, self.exponent)
+        for batch in self.batches(total, model._meta.verbose_name_plural):
+            model.objects.bulk_create(
+                (
+                    model(**{'user_id': user_id,
+                             f'{target_field}_id': target_id})
+                    for user_id, target_id in zip(
+                        random.choices(user_ids, k=len(batch)),
+                        targets.sample(len(batch)),
+                    )
+                    if user_id != target_id or target_field != 'author'
+                ),
+                ignore_conflicts=True,
+            )
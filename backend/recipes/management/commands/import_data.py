@@ -1,44 +1,156 @@
 import csv
+import json
+import os
 
-from tqdm import tqdm
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
-from recipes.models import Ingredient
+from foodgram import constants as c
+from recipes import bulk
+from recipes.models import Ingredient, IngredientChange, RecipeIngredient
+from recipes.signals import ingredients_imported
+
+STAGING_TABLE = 'ingredient_import'
+UPSERT_SQL = f'''
+    INSERT INTO {Ingredient._meta.db_table} (name, measurement_unit)
+    SELECT name, measurement_unit FROM {STAGING_TABLE}
+    ON CONFLICT (name) DO UPDATE
+    SET measurement_unit = EXCLUDED.measurement_unit
+    WHERE {Ingredient._meta.db_table}.measurement_unit
+        <> EXCLUDED.measurement_unit
+    RETURNING id, name, measurement_unit, xmax = 0
+'''
+
+
+def read_csv(file):
+    yield from csv.reader(file)
+
+
+def read_json(file):
+    data = json.load(file)
+    if not isinstance(data, list):
+        raise CommandError('Expected a JSON array of ingredients.')
+    for item in data:
+        if isinstance(item, dict):
+            yield item.get('name'), item.get('measurement_unit')
+        else:
+            yield (item,)
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
 
 
 class Command(BaseCommand):
-    help = 'Import data from csv file into Ingredient model in database'
+    help = 'Upsert ingredients from a csv or json file'
 
     def add_arguments(self, parser):
         parser.add_argument('--path', type=str, help='Path to file')
+        parser.add_argument('--format', choices=READERS,
+                            help='File format, guessed from the extension '
+                                 'by default')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete ingredients missing from the file '
+                                 'that no recipe uses')
 
     def handle(self, *args, **options):
         path = (options.get('path')
                 or f'{settings.BASE_DIR}/data/ingredients.csv')
-        success_count = 0
-        self.stdout.write("Loading data...", ending='')
-        Ingredient.objects.all().delete()
-        self.stdout.write('Database cleared.')
-        with open(path, 'r', encoding='utf-8') as csv_file:
-            reader = csv.reader(csv_file)
-            total_lines = sum(1 for _ in open(path, 'r', encoding='utf-8'))
-            csv_file.seek(0)
-
-            for row in tqdm(reader, total=total_lines,
-                            desc="Importing ingredients"):
-                name_csv = 0
-                unit_csv = 1
-                try:
-                    obj, created = Ingredient.objects.get_or_create(
-                        name=row[name_csv],
-                        measurement_unit=row[unit_csv],
-                    )
-                    if created:
-                        success_count += 1
-                    if not created:
-                        self.stdout.write(f"Invalid row: {row}")
-                except IndexError as err:
-                    self.stdout.write(f'Error in row {row}: {err}')
-        self.stdout.write(f"{success_count} entries were"
-                          "imported from .csv file.", ending='')
+        file_format = (options.get('format')
+                       or os.path.splitext(path)[1].lstrip('.').lower())
+        if file_format not in READERS:
+            raise CommandError(f'Unknown file format: {file_format!r}.')
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            ingredients = self.dedupe(READERS[file_format](file))
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                changes = self.upsert_staged(ingredients)
+            else:
+                changes = self.upsert(ingredients)
+            bulk.copy_rows(
+                IngredientChange,
+                ('ingredient_id', 'action', 'name', 'measurement_unit'),
+                changes,
+            )
+            pruned = self.prune(ingredients) if options['prune'] else 0
+            if changes:
+                ingredients_imported.send(sender=Ingredient,
+                                          changes=len(changes))
+        created = sum(action == IngredientChange.CREATED
+                      for _, action, _, _ in changes)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(ingredients)} ingredients read: {created} created, '
+            f'{len(changes) - created} updated, {pruned} pruned.'))
+
+    def dedupe(self, rows):
+        ingredients = {}
+        for number, row in enumerate(rows, 1):
+            if (len(row) != 2
+                    or not all(isinstance(value, str) and value.strip()
+                               for value in row)):
+                self.stdout.write(f'Invalid row {number}: {row}')
+                continue
+            name, unit = (value.strip() for value in row)
+            if (len(name) > c.INGREDIENT_NAME_MAX_LENGTH
+                    or len(unit) > c.MEASUREMENT_UNIT_MAX_LENGTH):
+                self.stdout.write(f'Row {number} is too long: {row}')
+                continue
+            ingredients[name] = unit
+        return ingredients
+
+    def upsert_staged(self, ingredients):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {STAGING_TABLE} '
+                '(name text, measurement_unit text) ON COMMIT DROP')
+            bulk.copy_into(STAGING_TABLE, ('name', 'measurement_unit'),
+                           ingredients.items())
+            cursor.execute(UPSERT_SQL)
+            return [
+                (pk, IngredientChange.CREATED if created
+                 else IngredientChange.UPDATED, name, unit)
+                for pk, name, unit, created in cursor.fetchall()
+            ]
+
+    def upsert(self, ingredients):
+        existing = {
+            name: (pk, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                'pk', 'name', 'measurement_unit').iterator()
+            if name in ingredients
+        }
+        changed = [
+            Ingredient(pk=existing[name][0], name=name, measurement_unit=unit)
+            for name, unit in ingredients.items()
+            if name in existing and existing[name][1] != unit
+        ]
+        Ingredient.objects.bulk_update(changed, ('measurement_unit',),
+                                       batch_size=c.IMPORT_BATCH_SIZE)
+        created = Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=unit)
+             for name, unit in ingredients.items() if name not in existing),
+            batch_size=c.IMPORT_BATCH_SIZE,
+        )
+        if created and created[0].pk is None:
+            ids = dict(Ingredient.objects.filter(
+                name__in=[obj.name for obj in created]
+            ).values_list('name', 'pk'))
+            for obj in created:
+                obj.pk = ids[obj.name]
+        return [
+            *((obj.pk, IngredientChange.CREATED, obj.name,
+               obj.measurement_unit) for obj in created),
+            *((obj.pk, IngredientChange.UPDATED, obj.name,
+               obj.measurement_unit) for obj in changed),
+        ]
+
+    def prune(self, ingredients):
+        deleted, _ = Ingredient.objects.exclude(
+            name__in=ingredients
+        ).exclude(
+            pk__in=RecipeIngredient.objects.values('ingredient')
+        ).delete()
+        return deleted
@@ -0,0 +1,42 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from foodgram import constants as c
+from recipes.importer import RecipeImporter
+
+
+class Command(BaseCommand):
+    help = ('Bulk import recipes from a JSON Lines file, resuming from the '
+            'last checkpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the .jsonl file')
+        parser.add_argument('--batch-size', type=int,
+                            default=c.IMPORT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=c.IMPORT_WORKERS,
+                            help='Processes decoding images')
+        parser.add_argument('--errors', help='Where to write the per-row '
+                            'error report (default: <path>.errors.jsonl)')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint and start over')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        errors_path = options['errors'] or f'{path}.errors.jsonl'
+        with open(errors_path, 'w' if options['restart'] else 'a',
+                  encoding='utf-8') as errors:
+
+            def report(line, messages):
+                errors.write(json.dumps({'line': line, 'errors': messages},
+                                        ensure_ascii=False) + '\n')
+
+            importer = RecipeImporter(
+                path, batch_size=options['batch_size'],
+                workers=options['workers'], report=report)
+            with open(path, 'rb') as file:
+                progress = importer.run(file, restart=options['restart'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{progress.imported} recipes imported, {progress.failed} rows '
+            f'failed after {progress.lines} lines. Errors: {errors_path}'))
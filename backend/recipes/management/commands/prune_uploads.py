@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodgram import constants as c
+from recipes.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Delete uploaded images that no recipe or avatar has claimed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--age', type=int, default=c.UPLOAD_TTL,
+                            help='Minimum age in seconds')
+
+    def handle(self, *args, **options):
+        expired = Upload.objects.filter(
+            created__lt=timezone.now() - timedelta(seconds=options['age']))
+        count = 0
+        for upload in expired:
+            upload.discard()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'{count} uploads deleted.'))
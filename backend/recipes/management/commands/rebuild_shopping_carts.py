@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from recipes import cart
+
+
+class Command(BaseCommand):
+    help = ('Verify the materialized shopping cart totals against the '
+            'shopping lists and fix any drift')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append',
+                            dest='users', help='Only check this user id')
+        parser.add_argument('--verify', action='store_true',
+                            help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        deltas = cart.drift(options['users'])
+        for (user_id, ingredient_id), delta in sorted(deltas.items()):
+            self.stdout.write(f'User {user_id}, ingredient {ingredient_id}: '
+                              f'off by {delta:+d}')
+        if not deltas:
+            self.stdout.write(self.style.SUCCESS('Shopping carts are in '
+                                                 'sync.'))
+        elif not options['verify']:
+            cart.apply_deltas(deltas)
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {len(deltas)} shopping cart totals.'))
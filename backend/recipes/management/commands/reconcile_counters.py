@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = ('Compare the denormalized recipe and user counters with the '
+            'actual rows and fix any drift')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        rows = counters.drift()
+        for model, pk, field, stored, actual in rows:
+            self.stdout.write(f'{model._meta.verbose_name} {pk} {field}: '
+                              f'stored {stored}, actual {actual}')
+        if not rows:
+            self.stdout.write(self.style.SUCCESS('Counters are in sync.'))
+        elif not options['verify']:
+            counters.reconcile(rows)
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {len(rows)} counters.'))
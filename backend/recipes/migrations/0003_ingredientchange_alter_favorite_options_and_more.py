@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient_id', models.BigIntegerField(verbose_name='Ingredient id')),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=16, verbose_name='Action')),
+                ('name', models.CharField(blank=True, max_length=128, verbose_name='Ingredient name')),
+                ('measurement_unit', models.CharField(blank=True, max_length=64, verbose_name='Ingredient measurement unit')),
+            ],
+            options={
+                'verbose_name': 'Ingredient change',
+                'verbose_name_plural': 'Ingredient changes',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'ordering': ['user'], 'verbose_name': 'Favorite', 'verbose_name_plural': 'Favorites'},
+        ),
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'ordering': ['name'], 'verbose_name': 'Ingredient', 'verbose_name_plural': 'Ingredients'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ('-name',), 'verbose_name': 'Recipe', 'verbose_name_plural': 'Recipes'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipeingredient',
+            options={'default_related_name': 'recipe_ingredients', 'ordering': ['recipe'], 'verbose_name': 'Ingredient amount', 'verbose_name_plural': 'Ingredient amounts'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipetags',
+            options={'default_related_name': 'recipe_tags', 'ordering': ('tag',), 'verbose_name': 'Recipe tag', 'verbose_name_plural': 'Recipe tags'},
+        ),
+        migrations.AlterModelOptions(
+            name='shoppinglist',
+            options={'ordering': ['user'], 'verbose_name': 'Shopping list', 'verbose_name_plural': 'Shopping lists'},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'ordering': ['name'], 'verbose_name': 'Tag', 'verbose_name_plural': 'Tags'},
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='recipes.recipe', verbose_name='Favorite recipe'),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to=settings.AUTH_USER_MODEL, verbose_name='Favorite user'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient', verbose_name='Ingredient'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='Recipe'),
+        ),
+        migrations.AlterField(
+            model_name='recipetags',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='Recipe'),
+        ),
+        migrations.AlterField(
+            model_name='recipetags',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.tag', verbose_name='Tag'),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglist',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_lists', to='recipes.recipe', verbose_name='Recipe'),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglist',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_lists', to=settings.AUTH_USER_MODEL, verbose_name='User'),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=models.SlugField(help_text='Tag slug', max_length=32, unique=True, verbose_name='Tag slug'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredientchange_alter_favorite_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-name', '-id'], name='recipe_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Last change of the recipe, its ingredients, tags or author', verbose_name='Last modified'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_shopping_cart_items(apps, schema_editor):
+    ShoppingList = apps.get_model('recipes', 'ShoppingList')
+    ShoppingCartItem = apps.get_model('recipes', 'ShoppingCartItem')
+    rows = ShoppingList.objects.values_list(
+        'user_id', 'recipe__recipe_ingredients__ingredient_id'
+    ).annotate(total=Sum('recipe__recipe_ingredients__amount')).order_by()
+    ShoppingCartItem.objects.bulk_create(
+        (
+            ShoppingCartItem(user_id=user_id, ingredient_id=ingredient_id,
+                             total=total)
+            for user_id, ingredient_id, total in rows.iterator()
+            if ingredient_id is not None
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_modified'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(verbose_name='Total amount')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to='recipes.ingredient', verbose_name='Ingredient')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Shopping cart item',
+                'verbose_name_plural': 'Shopping cart items',
+                'ordering': ('user', 'ingredient'),
+                'constraints': [models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_cart_item')],
+            },
+        ),
+        migrations.RunPython(fill_shopping_cart_items,
+                             migrations.RunPython.noop),
+    ]
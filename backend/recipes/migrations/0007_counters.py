@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, related):
+    return Coalesce(Subquery(
+        model.objects.filter(**{related: OuterRef('pk')}).order_by()
+        .values(related).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('users', 'User')
+    Recipe.objects.update(
+        favorites_count=count_of(apps.get_model('recipes', 'Favorite'),
+                                 'recipe'),
+        shopping_cart_count=count_of(
+            apps.get_model('recipes', 'ShoppingList'), 'recipe'),
+    )
+    User.objects.update(
+        recipes_count=count_of(Recipe, 'author'),
+        followers_count=count_of(apps.get_model('users', 'Follow'),
+                                 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_shoppingcartitem'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Favorites count'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Shopping cart count'),
+        ),
+        migrations.CreateModel(
+            name='RecipeCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('favorites', 'Favorites'), ('shopping_cart', 'Shopping cart')], max_length=16, verbose_name='Counter')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Shard')),
+                ('value', models.IntegerField(default=0, verbose_name='Value')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='recipes.recipe', verbose_name='Recipe')),
+            ],
+            options={
+                'verbose_name': 'Recipe counter shard',
+                'verbose_name_plural': 'Recipe counter shards',
+                'ordering': ('recipe', 'kind', 'shard'),
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'kind', 'shard'), name='unique_recipe_counter_shard')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
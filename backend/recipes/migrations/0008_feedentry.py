@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+FEED_MAX_ENTRIES = 1000
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_BATCH_SIZE = 1000
+
+
+def fill_feeds(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    follows = Follow.objects.filter(
+        author__followers_count__lt=FEED_FANOUT_MAX_FOLLOWERS,
+    ).values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        recipe_ids = Recipe.objects.filter(author_id=author_id).order_by(
+            '-pk').values_list('pk', flat=True)[:FEED_MAX_ENTRIES]
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                       author_id=author_id) for recipe_id in recipe_ids],
+            ignore_conflicts=True,
+        )
+    overflow = FeedEntry.objects.annotate(
+        rank=Window(RowNumber(), partition_by=F('user'),
+                    order_by=F('recipe').desc()),
+    ).filter(rank__gt=FEED_MAX_ENTRIES).values_list('pk', flat=True)
+    overflow = list(overflow)
+    for start in range(0, len(overflow), FEED_BATCH_SIZE):
+        FeedEntry.objects.filter(
+            pk__in=overflow[start:start + FEED_BATCH_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Recipe author')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Reader')),
+            ],
+            options={
+                'verbose_name': 'Feed entry',
+                'verbose_name_plural': 'Feed entries',
+                'ordering': ('user', '-recipe'),
+                'indexes': [models.Index(fields=['user', 'author'], name='feed_user_author_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry')],
+            },
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
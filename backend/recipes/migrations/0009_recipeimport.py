@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Source')),
+                ('position', models.PositiveBigIntegerField(default=0, verbose_name='Byte offset of the next line')),
+                ('lines', models.PositiveIntegerField(default=0, verbose_name='Lines processed')),
+                ('imported', models.PositiveIntegerField(default=0, verbose_name='Recipes imported')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='Rows failed')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Last checkpoint')),
+            ],
+            options={
+                'verbose_name': 'Recipe import',
+                'verbose_name_plural': 'Recipe imports',
+                'ordering': ('-updated',),
+            },
+        ),
+    ]
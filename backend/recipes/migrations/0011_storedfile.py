@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='File name')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Size in bytes')),
+                ('references', models.PositiveIntegerField(default=0, help_text='Number of model fields pointing at the file', verbose_name='References')),
+            ],
+            options={
+                'verbose_name': 'Stored file',
+                'verbose_name_plural': 'Stored files',
+                'ordering': ('name',),
+            },
+        ),
+    ]
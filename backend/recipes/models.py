@@ -1,8 +1,9 @@
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce, RowNumber
 
 from foodgram import constants as c
-from users.models import User
+from users.models import ProcessedImageMixin, User
 
 
 class Ingredient(models.Model):
@@ -33,6 +34,49 @@ class Ingredient(models.Model):
         return f'{self.name} ({self.measurement_unit})'
 
 
+class IngredientChange(models.Model):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    )
+
+    ingredient_id = models.BigIntegerField(
+        verbose_name='Ingredient id',
+    )
+    action = models.CharField(
+        max_length=c.INGREDIENT_CHANGE_ACTION_MAX_LENGTH,
+        choices=ACTIONS,
+        verbose_name='Action',
+    )
+    name = models.CharField(
+        max_length=c.INGREDIENT_NAME_MAX_LENGTH,
+        blank=True,
+        verbose_name='Ingredient name',
+    )
+    measurement_unit = models.CharField(
+        max_length=c.MEASUREMENT_UNIT_MAX_LENGTH,
+        blank=True,
+        verbose_name='Ingredient measurement unit',
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Ingredient change'
+        verbose_name_plural = 'Ingredient changes'
+
+    def __str__(self):
+        return f'#{self.id} {self.action} ingredient {self.ingredient_id}'
+
+    @classmethod
+    def current_version(cls):
+        return cls.objects.aggregate(
+            version=models.Max('id'))['version'] or 0
+
+
 class Tag(models.Model):
     name = models.CharField(
         max_length=c.TAG_NAME_MAX_LENGTH,
@@ -55,7 +99,58 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+            is_in_shopping_cart=models.Exists(ShoppingList.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+        )
+
+    def with_counters(self):
+        shards = RecipeCounterShard.objects.filter(
+            recipe=models.OuterRef('pk')).order_by().values('recipe')
+        return self.annotate(**{
+            f'{kind}_total': models.F(f'{kind}_count') + Coalesce(
+                models.Subquery(shards.filter(kind=kind).annotate(
+                    value_sum=models.Sum('value')).values('value_sum')),
+                0,
+            )
+            for kind, _ in RecipeCounterShard.KINDS
+        })
+
+    def top_per_author(self, limit):
+        return self.annotate(author_rank=models.Window(
+            RowNumber(),
+            partition_by=models.F('author'),
+            order_by=('-name', '-id'),
+        )).filter(author_rank__lte=limit)
+
+    def for_read(self, user):
+        return self.prefetch_related(
+            models.Prefetch(
+                'author',
+                queryset=User.objects.with_is_subscribed(user),
+            ),
+            'tags',
+            models.Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient').order_by('pk'),
+            ),
+        ).with_user_flags(user).with_counters()
+
+
+class Recipe(ProcessedImageMixin, models.Model):
+    processed_fields = ('image_width', 'image_height', 'image_renditions')
+    counter_fields = ('favorites_count', 'shopping_cart_count')
     name = models.CharField(
         max_length=c.RECIPE_NAME_MAX_LENGTH,
         verbose_name='Recipe name',
@@ -85,6 +180,22 @@ class Recipe(models.Model):
         help_text='Recipe image',
         upload_to='media/recipes/',
     )
+    image_width = models.PositiveIntegerField(
+        null=True,
+        editable=False,
+        verbose_name='Recipe image width',
+    )
+    image_height = models.PositiveIntegerField(
+        null=True,
+        editable=False,
+        verbose_name='Recipe image height',
+    )
+    image_renditions = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Recipe image renditions',
+        help_text='Resized copies of the recipe image by size and format',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -98,15 +209,44 @@ class Recipe(models.Model):
         verbose_name='Recipe tags',
         help_text='Recipe tags',
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Last modified',
+        help_text='Last change of the recipe, its ingredients, tags '
+                  'or author',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Favorites count',
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Shopping cart count',
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-name',)
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
+        indexes = (
+            models.Index(fields=('-name', '-id'), name='recipe_name_id_idx'),
+        )
 
     def __str__(self):
         return self.name
 
+    def counter_total(self, kind):
+        total = getattr(self, f'{kind}_total', None)
+        if total is None:
+            total = getattr(self, f'{kind}_count') + (
+                self.counter_shards.filter(kind=kind).aggregate(
+                    value=models.Sum('value'))['value'] or 0)
+        return total
+
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
@@ -224,3 +364,214 @@ class ShoppingList(models.Model):
         return (
             f'Recipe {self.recipe} is in shopping list of user {self.user}'
         )
+
+
+class ShoppingCartItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_items',
+        verbose_name='User',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_items',
+        verbose_name='Ingredient',
+    )
+    total = models.PositiveIntegerField(
+        verbose_name='Total amount',
+    )
+
+    class Meta:
+        ordering = ('user', 'ingredient')
+        verbose_name = 'Shopping cart item'
+        verbose_name_plural = 'Shopping cart items'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_item',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} needs {self.total} of {self.ingredient}'
+
+
+class RecipeCounterShard(models.Model):
+    FAVORITES = 'favorites'
+    SHOPPING_CART = 'shopping_cart'
+    KINDS = (
+        (FAVORITES, 'Favorites'),
+        (SHOPPING_CART, 'Shopping cart'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='counter_shards',
+        verbose_name='Recipe',
+    )
+    kind = models.CharField(
+        max_length=c.COUNTER_KIND_MAX_LENGTH,
+        choices=KINDS,
+        verbose_name='Counter',
+    )
+    shard = models.PositiveSmallIntegerField(
+        verbose_name='Shard',
+    )
+    value = models.IntegerField(
+        default=0,
+        verbose_name='Value',
+    )
+
+    class Meta:
+        ordering = ('recipe', 'kind', 'shard')
+        verbose_name = 'Recipe counter shard'
+        verbose_name_plural = 'Recipe counter shards'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'kind', 'shard'),
+                name='unique_recipe_counter_shard',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} {self.kind} shard {self.shard}: {self.value}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Reader',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Recipe',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Recipe author',
+    )
+
+    class Meta:
+        ordering = ('user', '-recipe')
+        verbose_name = 'Feed entry'
+        verbose_name_plural = 'Feed entries'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry',
+            ),
+        )
+        indexes = (
+            models.Index(fields=('user', 'author'),
+                         name='feed_user_author_idx'),
+        )
+
+    def __str__(self):
+        return f'Recipe {self.recipe} is in the feed of user {self.user}'
+
+
+class RecipeImport(models.Model):
+    source = models.CharField(
+        max_length=c.IMPORT_SOURCE_MAX_LENGTH,
+        unique=True,
+        verbose_name='Source',
+    )
+    position = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Byte offset of the next line',
+    )
+    lines = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Lines processed',
+    )
+    imported = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Recipes imported',
+    )
+    failed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Rows failed',
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Last checkpoint',
+    )
+
+    class Meta:
+        ordering = ('-updated',)
+        verbose_name = 'Recipe import'
+        verbose_name_plural = 'Recipe imports'
+
+    def __str__(self):
+        return f'{self.source}: {self.imported} imported, {self.failed} failed'
+
+
+class StoredFile(models.Model):
+    name = models.CharField(
+        max_length=c.STORED_FILE_NAME_MAX_LENGTH,
+        unique=True,
+        verbose_name='File name',
+    )
+    size = models.PositiveBigIntegerField(
+        verbose_name='Size in bytes',
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='References',
+        help_text='Number of model fields pointing at the file',
+    )
+
+    class Meta:
+        ordering = ('name',)
+        verbose_name = 'Stored file'
+        verbose_name_plural = 'Stored files'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class Upload(models.Model):
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='uploads',
+        verbose_name='Owner',
+    )
+    file = models.ImageField(
+        upload_to='media/uploads/',
+        verbose_name='Uploaded image',
+    )
+    width = models.PositiveIntegerField(
+        verbose_name='Width',
+    )
+    height = models.PositiveIntegerField(
+        verbose_name='Height',
+    )
+    size = models.PositiveBigIntegerField(
+        verbose_name='Size in bytes',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Uploaded',
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Upload'
+        verbose_name_plural = 'Uploads'
+
+    def __str__(self):
+        return f'{self.file.name} ({self.owner})'
+
+    def discard(self):
+        self.file.delete(save=False)
+        self.delete()
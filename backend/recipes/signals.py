@@ -0,0 +1,230 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from recipes import cart, counters, feed, images
+from recipes.models import (Favorite, Ingredient, IngredientChange, Recipe,
+                            RecipeIngredient, RecipeTags, ShoppingList)
+from users.models import Follow, User
+
+recipe_changed = Signal()
+recipes_imported = Signal()
+ingredients_imported = Signal()
+renditions_built = Signal()
+
+IMAGE_FIELDS = {
+    Recipe: 'image',
+    User: 'avatar',
+}
+
+
+def origin_model(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model
+    return type(origin)
+
+
+def once_per_origin(origin, key):
+    if not isinstance(origin, QuerySet):
+        return True
+    seen = origin.__dict__.setdefault('_signal_keys', set())
+    if key in seen:
+        return False
+    seen.add(key)
+    return True
+
+
+def touch_recipes(**filters):
+    Recipe.objects.filter(**filters).update(modified=timezone.now())
+
+
+@receiver(post_save, sender=Ingredient)
+def log_ingredient_save(instance, created, **kwargs):
+    IngredientChange.objects.create(
+        ingredient_id=instance.id,
+        action=(IngredientChange.CREATED if created
+                else IngredientChange.UPDATED),
+        name=instance.name,
+        measurement_unit=instance.measurement_unit,
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+def log_ingredient_delete(instance, **kwargs):
+    IngredientChange.objects.create(
+        ingredient_id=instance.id,
+        action=IngredientChange.DELETED,
+    )
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver((post_save, post_delete), sender=RecipeTags)
+def touch_recipe(instance, origin=None, **kwargs):
+    if once_per_origin(origin, ('touch', instance.recipe_id)):
+        touch_recipes(pk=instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_on_set(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_recipes(pk=instance.pk)
+    elif action == 'pre_clear':
+        field = 'tags' if sender is Recipe.tags.through else 'ingredients'
+        touch_recipes(**{field: instance})
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(pk__in=pk_set)
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    touch_recipes(author=instance)
+
+
+@receiver(post_save, sender=ShoppingList)
+def add_to_cart_totals(instance, created, **kwargs):
+    if created:
+        cart.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingList)
+def remove_from_cart_totals(instance, origin=None, **kwargs):
+    if origin_model(origin) is not User:
+        cart.remove_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_recipe_ingredient(instance, **kwargs):
+    instance._previous = RecipeIngredient.objects.filter(
+        pk=instance.pk).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def update_cart_totals(instance, **kwargs):
+    amounts = {instance.ingredient_id: instance.amount}
+    if instance._previous is not None:
+        ingredient_id, amount = instance._previous
+        amounts[ingredient_id] = amounts.get(ingredient_id, 0) - amount
+    cart.change_recipe_ingredients(instance.recipe_id, amounts)
+
+
+@receiver(pre_delete, sender=RecipeIngredient)
+def subtract_cart_totals(instance, origin=None, **kwargs):
+    if origin_model(origin) in (Recipe, Ingredient, User):
+        return
+    rows = [(instance.recipe_id, instance.ingredient_id, instance.amount)]
+    if isinstance(origin, QuerySet):
+        if getattr(origin, '_cart_subtracted', False):
+            return
+        origin._cart_subtracted = True
+        rows = origin.values_list('recipe_id', 'ingredient_id', 'amount')
+    amounts = defaultdict(dict)
+    for recipe_id, ingredient_id, amount in rows:
+        amounts[recipe_id][ingredient_id] = -amount
+    for recipe_id, recipe_amounts in amounts.items():
+        cart.change_recipe_ingredients(recipe_id, recipe_amounts)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+def count_recipe_added(sender, instance, created, **kwargs):
+    if created:
+        counters.change_recipe_counter(
+            instance.recipe_id, counters.RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+def count_recipe_removed(sender, instance, origin=None, **kwargs):
+    model = origin_model(origin)
+    if model is not Recipe:
+        counters.change_recipe_counter(
+            instance.recipe_id, counters.RECIPE_COUNTERS[sender], -1,
+            sharded=model is sender)
+
+
+@receiver(post_save, sender=Recipe)
+def count_recipe_created(instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_recipe_deleted(instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow_created(instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_follow_deleted(instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: feed.fan_out(instance.pk, instance.author_id))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(instance, origin=None, **kwargs):
+    if origin_model(origin) is not User:
+        feed.prune(instance.user_id, instance.author_id)
+
+
+@receiver(recipe_changed)
+def apply_recipe_changes_to_carts(recipe, ingredients_added,
+                                  ingredients_changed, **kwargs):
+    # Removed ingredients are subtracted by subtract_cart_totals.
+    amounts = dict(ingredients_added)
+    amounts.update({
+        pk: amount - previous
+        for pk, (previous, amount) in ingredients_changed.items()
+    })
+    if amounts:
+        cart.change_recipe_ingredients(recipe.pk, amounts)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def schedule_renditions(sender, instance, **kwargs):
+    field = IMAGE_FIELDS[sender]
+    if images.is_stale(instance, field):
+        images.schedule(sender, field, (instance.pk,))
+
+
+@receiver(recipe_changed)
+def schedule_changed_image(recipe, fields, **kwargs):
+    if 'image' in fields:
+        images.schedule(Recipe, 'image', (recipe.pk,))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=User)
+def release_image_files(sender, instance, **kwargs):
+    field = IMAGE_FIELDS[sender]
+    file = getattr(instance, field)
+    for name in (file.name, *images.rendition_paths(
+            getattr(instance, f'{field}_renditions'))):
+        file.storage.delete(name)
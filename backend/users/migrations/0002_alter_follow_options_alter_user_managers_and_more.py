@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:56
+
+import django.core.validators
+import users.models
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'ordering': ('author',), 'verbose_name': 'Subscription', 'verbose_name_plural': 'Subscriptions'},
+        ),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.CustomUserManager()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='username',
+            field=models.CharField(max_length=150, unique=True, validators=[django.core.validators.RegexValidator(message='Username contains restricted symbols. Please use only letters, numbers and .@+- symbols', regex='^[\\w.@+-]+$'), users.validators.validate_username_not_me], verbose_name='Unique username'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_height',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='Avatar height'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_renditions',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Avatar renditions'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_width',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='Avatar width'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import RegexValidator
 from django.db import models
 
@@ -6,7 +6,38 @@ from foodgram import constants as c
 from .validators import validate_username_not_me
 
 
-class User(AbstractUser):
+class UserQuerySet(models.QuerySet):
+
+    def with_is_subscribed(self, user):
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=models.Value(False))
+        return self.annotate(is_subscribed=models.Exists(
+            Follow.objects.filter(user=user, author=models.OuterRef('pk'))
+        ))
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
+class ProcessedImageMixin:
+    processed_fields = ()
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.processed_fields
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(ProcessedImageMixin, AbstractUser):
+    processed_fields = ('avatar_width', 'avatar_height', 'avatar_renditions')
+    counter_fields = ('recipes_count', 'followers_count')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
         'username',
@@ -42,6 +73,33 @@ class User(AbstractUser):
         null=True,
         upload_to='media/avatars/',
     )
+    avatar_width = models.PositiveIntegerField(
+        null=True,
+        editable=False,
+        verbose_name='Avatar width',
+    )
+    avatar_height = models.PositiveIntegerField(
+        null=True,
+        editable=False,
+        verbose_name='Avatar height',
+    )
+    avatar_renditions = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Avatar renditions',
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Recipes count',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Followers count',
+    )
+
+    objects = CustomUserManager()
 
     class Meta:
         verbose_name = 'User'